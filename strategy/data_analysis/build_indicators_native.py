@@ -0,0 +1,53 @@
+"""
+AOT编译技术指标内核
+生成原生扩展 indicators_native，运行时直接调用，免去 Numba JIT 首次编译的预热开销
+
+用法（在 strategy 目录下执行）：
+    python -m data_analysis.build_indicators_native
+"""
+import os
+
+from numba.pycc import CC
+
+# 构建时必须基于JIT内核，不能加载已有的原生扩展
+os.environ["INDICATORS_JIT_ONLY"] = "1"
+
+from .indicators_fast import (  # noqa: E402
+    _boll_bands,
+    _close_kernel,
+    _hlc_kernel,
+    _kdj_smooth,
+    _macd_stream,
+    _rolling_mean,
+    _rsi_wilder,
+    _sliding_max,
+    _sliding_min,
+)
+
+cc = CC('indicators_native')
+cc.output_dir = os.path.dirname(os.path.abspath(__file__))
+
+# (导出名, 内核, 签名模板)：{t} 为价格数组元素类型，
+# 每个内核同时导出 float64 版本 <name> 与 float32 版本 <name>_f4
+KERNELS = [
+    ('close_kernel', _close_kernel,
+     'void({t}[:], i8[:], f8[:], i8, i8, i8, i8, f8, {t}[:, :], {t}[:, :], {t}[:, :], {t}[:, :])'),
+    ('hlc_kernel', _hlc_kernel,
+     'void({t}[:], {t}[:], {t}[:], i8, f8, f8, i8[:], i8, {t}[:, :], {t}[:, :], {t}[:])'),
+    ('macd_stream', _macd_stream, 'void({t}[:], f8, f8, f8, {t}[:], {t}[:], {t}[:])'),
+    ('rolling_mean', _rolling_mean, 'void({t}[:], i8, {t}[:])'),
+    ('boll_bands', _boll_bands, 'void({t}[:], i8, f8, {t}[:], {t}[:], {t}[:], {t}[:])'),
+    ('kdj_smooth', _kdj_smooth, 'void({t}[:], {t}[:], {t}[:], f8, f8, {t}[:], {t}[:], {t}[:])'),
+    ('sliding_max', _sliding_max, 'void({t}[:], i8, {t}[:])'),
+    ('sliding_min', _sliding_min, 'void({t}[:], i8, {t}[:])'),
+    ('rsi_wilder', _rsi_wilder, 'UniTuple(f8, 2)({t}[:], i8, {t}[:])'),
+]
+
+for name, kernel, signature in KERNELS:
+    cc.export(name, signature.format(t='f8'))(kernel.py_func)
+    cc.export(f'{name}_f4', signature.format(t='f4'))(kernel.py_func)
+
+
+if __name__ == "__main__":
+    cc.compile()
+    print(f"已生成 indicators_native 于 {cc.output_dir}")
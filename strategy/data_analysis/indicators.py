@@ -1,100 +1,410 @@
 """
 技术指标计算引擎
 """
+import math
+from dataclasses import dataclass
+
 import pandas as pd
 import numpy as np
 
+try:
+    import polars as pl
+except ImportError:  # polars为可选依赖，仅 calculate_all_polars 使用
+    pl = None
+
+from .indicators_fast import (
+    ATR_PERIOD,
+    BOLL_PARAMS,
+    EMA_PERIODS,
+    KDJ_PARAMS,
+    MA_PERIODS,
+    MACD_PARAMS,
+    RSI_PERIODS,
+    compute_all,
+    _boll_bands,
+    _ewm_step,
+    _kdj_smooth,
+    _macd_stream,
+    _rolling_mean,
+    _rsi_wilder,
+    _sliding_max,
+    _sliding_min,
+)
+
 
 class IndicatorEngine:
-    """技术指标计算引擎"""
+    """
+    技术指标计算引擎
+    各 add_* 方法先收集 {列名: ndarray}，再一次性 df.assign 写回，
+    避免逐列插入引起的 BlockManager 反复插入/合并
+    """
     
     @staticmethod
     def add_ma(df: pd.DataFrame, periods: list = [5, 10, 20, 60]) -> pd.DataFrame:
         """添加移动平均线"""
-        for period in periods:
-            df[f'ma{period}'] = df['close'].rolling(window=period).mean()
-        return df
+        close = df['close']
+        return df.assign(**{
+            f'ma{period}': close.rolling(window=period).mean().to_numpy()
+            for period in periods
+        })
     
     @staticmethod
     def add_ema(df: pd.DataFrame, periods: list = [12, 26]) -> pd.DataFrame:
         """添加指数移动平均线"""
-        for period in periods:
-            df[f'ema{period}'] = df['close'].ewm(span=period, adjust=False).mean()
-        return df
+        close = df['close']
+        return df.assign(**{
+            f'ema{period}': close.ewm(span=period, adjust=False).mean().to_numpy()
+            for period in periods
+        })
     
     @staticmethod
     def add_macd(df: pd.DataFrame, fast: int = 12, slow: int = 26, signal: int = 9) -> pd.DataFrame:
         """添加MACD指标"""
-        ema_fast = df['close'].ewm(span=fast, adjust=False).mean()
-        ema_slow = df['close'].ewm(span=slow, adjust=False).mean()
-        df['macd_dif'] = ema_fast - ema_slow
-        df['macd_dea'] = df['macd_dif'].ewm(span=signal, adjust=False).mean()
-        df['macd_hist'] = 2 * (df['macd_dif'] - df['macd_dea'])
-        return df
+        close = df['close'].to_numpy(dtype=np.float64)
+        return df.assign(**IndicatorEngine._macd_columns(close, fast, slow, signal))
     
     @staticmethod
     def add_kdj(df: pd.DataFrame, n: int = 9, m1: int = 3, m2: int = 3) -> pd.DataFrame:
         """添加KDJ指标"""
-        low_list = df['low'].rolling(window=n, min_periods=n).min()
-        high_list = df['high'].rolling(window=n, min_periods=n).max()
-        rsv = (df['close'] - low_list) / (high_list - low_list) * 100
-        
-        df['kdj_k'] = rsv.ewm(alpha=1/m1, adjust=False).mean()
-        df['kdj_d'] = df['kdj_k'].ewm(alpha=1/m2, adjust=False).mean()
-        df['kdj_j'] = 3 * df['kdj_k'] - 2 * df['kdj_d']
-        return df
+        high, low, close = IndicatorEngine._hlc_arrays(df)
+        return df.assign(**IndicatorEngine._kdj_columns(high, low, close, n, m1, m2))
     
     @staticmethod
     def add_rsi(df: pd.DataFrame, periods: list = [6, 12, 24]) -> pd.DataFrame:
-        """添加RSI指标"""
-        for period in periods:
-            delta = df['close'].diff()
-            gain = (delta.where(delta > 0, 0)).rolling(window=period).mean()
-            loss = (-delta.where(delta < 0, 0)).rolling(window=period).mean()
-            rs = gain / loss
-            df[f'rsi{period}'] = 100 - (100 / (1 + rs))
-        return df
+        """添加RSI指标（Wilder平滑）"""
+        close = df['close'].to_numpy(dtype=np.float64)
+        return df.assign(**IndicatorEngine._rsi_columns(close, periods))
     
     @staticmethod
     def add_boll(df: pd.DataFrame, period: int = 20, std: int = 2) -> pd.DataFrame:
         """添加布林带"""
-        df['boll_mid'] = df['close'].rolling(window=period).mean()
-        df['boll_std'] = df['close'].rolling(window=period).std()
-        df['boll_up'] = df['boll_mid'] + std * df['boll_std']
-        df['boll_down'] = df['boll_mid'] - std * df['boll_std']
-        return df
+        close = df['close'].to_numpy(dtype=np.float64)
+        cols = {name: np.empty(len(close)) for name in ('boll_mid', 'boll_std', 'boll_up', 'boll_down')}
+        _boll_bands(close, period, float(std), *cols.values())
+        return df.assign(**cols)
     
     @staticmethod
     def add_atr(df: pd.DataFrame, period: int = 14) -> pd.DataFrame:
         """添加ATR指标"""
-        high_low = df['high'] - df['low']
-        high_close = np.abs(df['high'] - df['close'].shift())
-        low_close = np.abs(df['low'] - df['close'].shift())
-        ranges = pd.concat([high_low, high_close, low_close], axis=1)
-        true_range = np.max(ranges, axis=1)
-        df[f'atr{period}'] = true_range.rolling(period).mean()
-        return df
+        high, low, close = IndicatorEngine._hlc_arrays(df)
+        return df.assign(**IndicatorEngine._atr_columns(high, low, close, period))
     
     @staticmethod
     def detect_ma_cross(df: pd.DataFrame, fast: int = 5, slow: int = 10) -> pd.DataFrame:
         """检测均线金叉/死叉"""
-        df['ma_diff'] = df[f'ma{fast}'] - df[f'ma{slow}']
-        df['cross_signal'] = 0
-        df.loc[(df['ma_diff'] > 0) & (df['ma_diff'].shift(1) <= 0), 'cross_signal'] = 1  # 金叉
-        df.loc[(df['ma_diff'] < 0) & (df['ma_diff'].shift(1) >= 0), 'cross_signal'] = -1  # 死叉
-        return df
-    
-    @staticmethod
-    def calculate_all(df: pd.DataFrame) -> pd.DataFrame:
-        """计算所有常用指标"""
-        df = IndicatorEngine.add_ma(df)
-        df = IndicatorEngine.add_ema(df)
-        df = IndicatorEngine.add_macd(df)
-        df = IndicatorEngine.add_kdj(df)
-        df = IndicatorEngine.add_rsi(df)
-        df = IndicatorEngine.add_boll(df)
-        df = IndicatorEngine.add_atr(df)
-        return df
+        diff = df[f'ma{fast}'].to_numpy(dtype=np.float64) - df[f'ma{slow}'].to_numpy(dtype=np.float64)
+        prev = np.empty_like(diff)
+        prev[:1] = np.nan
+        prev[1:] = diff[:-1]
+        golden = (diff > 0) & (prev <= 0)  # 金叉
+        death = (diff < 0) & (prev >= 0)   # 死叉
+        return df.assign(
+            ma_diff=diff,
+            cross_signal=golden.astype(np.int8) - death.astype(np.int8),
+        )
+    
+    @staticmethod
+    def calculate_all(df: pd.DataFrame, dtype=None) -> pd.DataFrame:
+        """
+        计算所有常用指标
+        dtype: 计算精度，默认收盘价为 float32 时按 float32 计算，否则 float64；
+               可传 'f4'/np.float32 显式选择单精度，内存读写量减半，适合长周期分钟线
+        """
+        if dtype is None:
+            dtype = np.float32 if df['close'].dtype == np.float32 else np.float64
+        dtype = np.dtype(dtype)
+        if dtype not in (np.float32, np.float64):
+            raise ValueError(f"不支持的计算精度: {dtype}，仅支持 float32/float64")
+        high, low, close = IndicatorEngine._hlc_arrays(df, dtype)
+        # 两个融合内核各遍历一次：收盘价类指标 + high/low/close 类指标
+        return df.assign(**compute_all(close, high, low))
+    
+    @staticmethod
+    def calculate_all_polars(df: pd.DataFrame) -> pd.DataFrame:
+        """
+        计算所有常用指标（polars实现）
+        全部指标放在同一个 with_columns 中，由polars查询引擎合并公共子表达式并多线程并行；
+        RSI 的 Wilder 种子递推无对应表达式，沿用 numba 内核结果
+        """
+        if pl is None:
+            raise ImportError("polars未安装，请使用 calculate_all 或 pip install polars")
+        
+        def ewm(expr, **kwargs):
+            # polars 在缺失值处输出null，pandas 则沿用上一个均值，前向填充对齐
+            return expr.ewm_mean(adjust=False, **kwargs).forward_fill()
+        
+        close = pl.col('close')
+        high = pl.col('high')
+        low = pl.col('low')
+        prev_close = close.shift(1)
+        
+        dif = ewm(close, span=12) - ewm(close, span=26)
+        dea = ewm(dif, span=9)
+        
+        lowest = low.rolling_min(9)
+        highest = high.rolling_max(9)
+        rsv = ((close - lowest) / (highest - lowest) * 100).fill_nan(None)
+        kdj_k = ewm(rsv, alpha=1 / 3)
+        kdj_d = ewm(kdj_k, alpha=1 / 3)
+        
+        boll_mid = close.rolling_mean(20)
+        boll_std = close.rolling_std(20)
+        
+        true_range = pl.max_horizontal(high - low,
+                                       (high - prev_close).abs(),
+                                       (low - prev_close).abs())
+        
+        rsi_cols = IndicatorEngine._rsi_columns(df['close'].to_numpy(dtype=np.float64))
+        
+        result = pl.from_pandas(df).with_columns(
+            [close.rolling_mean(p).alias(f'ma{p}') for p in (5, 10, 20, 60)]
+            + [ewm(close, span=p).alias(f'ema{p}') for p in (12, 26)]
+            + [
+                dif.alias('macd_dif'),
+                dea.alias('macd_dea'),
+                (2 * (dif - dea)).alias('macd_hist'),
+                kdj_k.alias('kdj_k'),
+                kdj_d.alias('kdj_d'),
+                (3 * kdj_k - 2 * kdj_d).alias('kdj_j'),
+            ]
+            + [pl.Series(name, values) for name, values in rsi_cols.items()]
+            + [
+                boll_mid.alias('boll_mid'),
+                boll_std.alias('boll_std'),
+                (boll_mid + 2 * boll_std).alias('boll_up'),
+                (boll_mid - 2 * boll_std).alias('boll_down'),
+                true_range.rolling_mean(14).alias('atr14'),
+            ]
+        )
+        out = result.to_pandas()
+        out.index = df.index
+        return out
+    
+    # ---- 列计算（输出与输入数组 dtype 一致，float64 或 float32）----
+    
+    @staticmethod
+    def _hlc_arrays(df: pd.DataFrame, dtype=np.float64) -> tuple:
+        """提取 high/low/close 数组"""
+        return (df['high'].to_numpy(dtype=dtype),
+                df['low'].to_numpy(dtype=dtype),
+                df['close'].to_numpy(dtype=dtype))
+    
+    @staticmethod
+    def _macd_columns(close: np.ndarray, fast: int = 12, slow: int = 26, signal: int = 9) -> dict:
+        """MACD: 单次遍历同时递推三条EMA"""
+        size = len(close)
+        dif = np.empty(size, dtype=close.dtype)
+        dea = np.empty(size, dtype=close.dtype)
+        hist = np.empty(size, dtype=close.dtype)
+        _macd_stream(close, 2.0 / (fast + 1), 2.0 / (slow + 1), 2.0 / (signal + 1),
+                     dif, dea, hist)
+        return {'macd_dif': dif, 'macd_dea': dea, 'macd_hist': hist}
+    
+    @staticmethod
+    def _kdj_columns(high: np.ndarray, low: np.ndarray, close: np.ndarray,
+                     n: int = 9, m1: int = 3, m2: int = 3) -> dict:
+        """KDJ: 单调队列求滑动极值 + 单次遍历递推平滑"""
+        size = len(close)
+        low_list = np.empty(size, dtype=low.dtype)
+        high_list = np.empty(size, dtype=high.dtype)
+        _sliding_min(low, n, low_list)
+        _sliding_max(high, n, high_list)
+        
+        cols = {name: np.empty(size, dtype=close.dtype) for name in ('kdj_k', 'kdj_d', 'kdj_j')}
+        _kdj_smooth(close, low_list, high_list, 1.0 / m1, 1.0 / m2, *cols.values())
+        return cols
+    
+    @staticmethod
+    def _rsi_columns(close: np.ndarray, periods: list = [6, 12, 24]) -> dict:
+        """RSI: 共用一份涨跌幅数组，逐周期Wilder递推"""
+        delta = np.diff(close, prepend=close[:1])
+        cols = {}
+        for period in periods:
+            out = np.empty(len(close), dtype=close.dtype)
+            _rsi_wilder(delta, period, out)
+            cols[f'rsi{period}'] = out
+        return cols
+    
+    @staticmethod
+    def _atr_columns(high: np.ndarray, low: np.ndarray, close: np.ndarray, period: int = 14) -> dict:
+        """ATR: numpy逐元素求真实波幅 + 累加和滚动均值"""
+        true_range = IndicatorEngine._true_range(high, low, close)
+        out = np.empty(len(close), dtype=close.dtype)
+        _rolling_mean(true_range, period, out)
+        return {f'atr{period}': out}
+    
+    @staticmethod
+    def _true_range(high: np.ndarray, low: np.ndarray, close: np.ndarray) -> np.ndarray:
+        """真实波幅 max(H-L, |H-前收|, |L-前收|)"""
+        prev_close = np.empty_like(close)
+        prev_close[:1] = np.nan
+        prev_close[1:] = close[:-1]
+        # fmax 跳过NaN，首根K线的真实波幅即为 high - low
+        true_range = np.fmax(high - low, np.abs(high - prev_close))
+        np.fmax(true_range, np.abs(low - prev_close), out=true_range)
+        return true_range
+    
+    # ---- 流式计算 ----
+    
+    @staticmethod
+    def stream_state(df: pd.DataFrame) -> 'IndicatorState':
+        """
+        基于历史K线初始化流式计算状态（默认参数，与 calculate_all 列一致）
+        之后每根新K线调用 state.update(close, high, low)，无需重算全部历史
+        """
+        high, low, close = IndicatorEngine._hlc_arrays(df)
+        window = max(max(MA_PERIODS), BOLL_PARAMS[0])
+        kdj_n = KDJ_PARAMS[0]
+        n = len(close)
+        if n < window:
+            raise ValueError(f"初始化流式指标至少需要 {window} 根K线，当前 {n} 根")
+        
+        last = {name: values[-1] for name, values in compute_all(close).items()}
+        kdj = IndicatorEngine._kdj_columns(high, low, close, *KDJ_PARAMS)
+        
+        delta = np.diff(close, prepend=close[:1])
+        rsi_avg = {}
+        for period in RSI_PERIODS:
+            avg_gain, avg_loss = _rsi_wilder(delta, period, np.empty(n))
+            rsi_avg[period] = [avg_gain, avg_loss]
+        
+        # 环形缓冲区：第 t 根K线存放在下标 t % 窗口长度
+        closes = np.empty(window)
+        positions = np.arange(n - window, n)
+        closes[positions % window] = close[-window:]
+        highs = np.empty(kdj_n)
+        lows = np.empty(kdj_n)
+        positions = np.arange(n - kdj_n, n)
+        highs[positions % kdj_n] = high[-kdj_n:]
+        lows[positions % kdj_n] = low[-kdj_n:]
+        true_range = IndicatorEngine._true_range(high, low, close)
+        true_ranges = np.empty(ATR_PERIOD)
+        positions = np.arange(n - ATR_PERIOD, n)
+        true_ranges[positions % ATR_PERIOD] = true_range[-ATR_PERIOD:]
+        
+        boll_window = close[-BOLL_PARAMS[0]:]
+        boll_mean = float(boll_window.mean())
+        return IndicatorState(
+            closes=closes,
+            highs=highs,
+            lows=lows,
+            true_ranges=true_ranges,
+            count=n,
+            prev_close=close[-1],
+            ma_sums={p: float(close[-p:].sum()) for p in MA_PERIODS},
+            ema={p: last[f'ema{p}'] for p in EMA_PERIODS},
+            # MACD 快慢线周期与 EMA_PERIODS 相同（12/26），直接接续对应EMA
+            macd_fast=last[f'ema{MACD_PARAMS[0]}'],
+            macd_slow=last[f'ema{MACD_PARAMS[1]}'],
+            macd_dea=last['macd_dea'],
+            boll_mean=boll_mean,
+            boll_m2=float(((boll_window - boll_mean) ** 2).sum()),
+            kdj_k=kdj['kdj_k'][-1],
+            kdj_d=kdj['kdj_d'][-1],
+            rsi_avg=rsi_avg,
+            tr_sum=float(true_ranges.sum()),
+        )
+
+
+@dataclass
+class IndicatorState:
+    """
+    指标流式计算状态
+    保存滚动窗口环形缓冲区与EMA/Wilder递推标量，新K线到来时单步推进，O(1)
+    递推公式与批量内核一致（EMA复用 _ewm_step），保证回测与实盘结果一致；
+    实时K线须为有效数值
+    """
+    closes: np.ndarray          # 收盘价环形缓冲区（长度为最大窗口）
+    highs: np.ndarray           # KDJ窗口内最高价
+    lows: np.ndarray            # KDJ窗口内最低价
+    true_ranges: np.ndarray     # ATR窗口内真实波幅
+    count: int                  # 已处理K线数量
+    prev_close: float
+    ma_sums: dict               # {周期: 窗口累加和}
+    ema: dict                   # {周期: EMA}
+    macd_fast: float
+    macd_slow: float
+    macd_dea: float
+    boll_mean: float            # 布林带窗口均值
+    boll_m2: float              # 布林带窗口离差平方和
+    kdj_k: float
+    kdj_d: float
+    rsi_avg: dict               # {周期: [平均涨幅, 平均跌幅]}
+    tr_sum: float
+    
+    def update(self, close: float, high: float, low: float) -> dict:
+        """推进一根K线，返回该K线的全部指标 {列名: 数值}"""
+        t = self.count
+        window = len(self.closes)
+        out = {}
+        
+        # 移动平均线（先读出滑出窗口的旧值，再写入新值）
+        for p in MA_PERIODS:
+            self.ma_sums[p] += close - self.closes[(t - p) % window]
+            out[f'ma{p}'] = self.ma_sums[p] / p
+        
+        # 指数移动平均线 / MACD
+        for p in EMA_PERIODS:
+            self.ema[p], _ = _ewm_step(self.ema[p], 1.0, close, 2.0 / (p + 1))
+            out[f'ema{p}'] = self.ema[p]
+        fast, slow, signal = MACD_PARAMS
+        self.macd_fast, _ = _ewm_step(self.macd_fast, 1.0, close, 2.0 / (fast + 1))
+        self.macd_slow, _ = _ewm_step(self.macd_slow, 1.0, close, 2.0 / (slow + 1))
+        dif = self.macd_fast - self.macd_slow
+        self.macd_dea, _ = _ewm_step(self.macd_dea, 1.0, dif, 2.0 / (signal + 1))
+        out['macd_dif'] = dif
+        out['macd_dea'] = self.macd_dea
+        out['macd_hist'] = 2.0 * (dif - self.macd_dea)
+        
+        # KDJ
+        n, m1, m2 = KDJ_PARAMS
+        self.highs[t % n] = high
+        self.lows[t % n] = low
+        lowest = self.lows.min()
+        highest = self.highs.max()
+        rsv = (close - lowest) / (highest - lowest) * 100 if highest > lowest else math.nan
+        self.kdj_k, _ = _ewm_step(self.kdj_k, 1.0, rsv, 1.0 / m1)
+        self.kdj_d, _ = _ewm_step(self.kdj_d, 1.0, self.kdj_k, 1.0 / m2)
+        out['kdj_k'] = self.kdj_k
+        out['kdj_d'] = self.kdj_d
+        out['kdj_j'] = 3 * self.kdj_k - 2 * self.kdj_d
+        
+        # RSI
+        delta = close - self.prev_close
+        gain = delta if delta > 0 else 0.0
+        loss = -delta if delta < 0 else 0.0
+        for p in RSI_PERIODS:
+            avg = self.rsi_avg[p]
+            avg[0] = (avg[0] * (p - 1) + gain) / p
+            avg[1] = (avg[1] * (p - 1) + loss) / p
+            if avg[1] > 0:
+                out[f'rsi{p}'] = 100.0 - 100.0 / (1.0 + avg[0] / avg[1])
+            else:
+                out[f'rsi{p}'] = 100.0 if avg[0] > 0 else math.nan
+        
+        # 布林带
+        period, k = BOLL_PARAMS
+        old = self.closes[(t - period) % window]
+        last_mean = self.boll_mean
+        self.boll_mean += (close - old) / period
+        self.boll_m2 += (close - old) * (close - self.boll_mean + old - last_mean)
+        mid = self.boll_mean
+        std = math.sqrt(self.boll_m2 / (period - 1)) if self.boll_m2 > 0 else 0.0
+        out['boll_mid'] = mid
+        out['boll_std'] = std
+        out['boll_up'] = mid + k * std
+        out['boll_down'] = mid - k * std
+        
+        # ATR
+        tr = max(high - low, abs(high - self.prev_close), abs(low - self.prev_close))
+        self.tr_sum += tr - self.true_ranges[t % ATR_PERIOD]
+        self.true_ranges[t % ATR_PERIOD] = tr
+        out[f'atr{ATR_PERIOD}'] = self.tr_sum / ATR_PERIOD
+        
+        self.closes[t % window] = close
+        self.prev_close = close
+        self.count = t + 1
+        return out
 
 
 # 测试
@@ -0,0 +1,523 @@
+"""
+技术指标快速计算内核 (Numba)
+直接在 numpy 数组上做 O(n) 递推，
+避免 pandas 逐指标 rolling/ewm 反复扫描同一列并生成中间 Series
+"""
+import os
+
+import numpy as np
+
+try:
+    from numba import njit
+except ImportError:  # 未安装numba时退化为纯Python实现（结果一致，速度较慢）
+    def njit(*args, **kwargs):
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return lambda func: func
+
+
+# 默认指标参数（与 IndicatorEngine 各 add_* 方法默认值保持一致）
+MA_PERIODS = (5, 10, 20, 60)
+EMA_PERIODS = (12, 26)
+MACD_PARAMS = (12, 26, 9)
+BOLL_PARAMS = (20, 2)
+KDJ_PARAMS = (9, 3, 3)
+RSI_PERIODS = (6, 12, 24)
+ATR_PERIOD = 14
+
+# 不启用 nnan/ninf：内核依赖 NaN 判断来对齐 pandas 的缺失值语义
+_FASTMATH = {"nsz", "arcp", "contract", "afn", "reassoc"}
+
+
+@njit(cache=True, fastmath=_FASTMATH)
+def _ewm_step(prev, old_wt, x, alpha):
+    """pandas ewm(adjust=False) 单步递推，返回 (新均值, 旧权重)"""
+    if prev == prev:
+        old_wt *= 1.0 - alpha
+        if x == x:
+            if prev != x:
+                prev = (old_wt * prev + alpha * x) / (old_wt + alpha)
+            old_wt = 1.0
+    elif x == x:
+        prev = x
+    return prev, old_wt
+
+
+@njit(cache=True, fastmath=_FASTMATH)
+def _close_kernel(close, ma_periods, ema_spans, macd_fast, macd_slow, macd_signal,
+                  boll_period, boll_k, ma_out, ema_out, macd_out, boll_out):
+    """
+    单次遍历计算全部基于收盘价的指标
+    - MA: 每个周期维护窗口累加和及有效值计数，s += x[i]; s -= x[i-p]
+    - EMA/MACD: 标量递推状态
+    - BOLL: 同一窗口的 Welford 增删更新同时得到均值与样本标准差
+    """
+    n = close.shape[0]
+    n_ma = ma_periods.shape[0]
+    n_ema = ema_spans.shape[0]
+
+    ma_sum = np.zeros(n_ma)
+    ma_cnt = np.zeros(n_ma, dtype=np.int64)
+    ema_val = np.full(n_ema, np.nan)
+    ema_wt = np.ones(n_ema)
+    ema_alpha = 2.0 / (ema_spans + 1.0)
+
+    a_fast = 2.0 / (macd_fast + 1.0)
+    a_slow = 2.0 / (macd_slow + 1.0)
+    a_sig = 2.0 / (macd_signal + 1.0)
+    e_fast = np.nan
+    e_slow = np.nan
+    e_sig = np.nan
+    w_fast = 1.0
+    w_slow = 1.0
+    w_sig = 1.0
+
+    b_mean = 0.0
+    b_m2 = 0.0
+    b_cnt = 0
+
+    for i in range(n):
+        x = close[i]
+        valid = x == x
+
+        # 移动平均线
+        for j in range(n_ma):
+            p = ma_periods[j]
+            if valid:
+                ma_sum[j] += x
+                ma_cnt[j] += 1
+            if i >= p:
+                old = close[i - p]
+                if old == old:
+                    ma_sum[j] -= old
+                    ma_cnt[j] -= 1
+            ma_out[j, i] = ma_sum[j] / p if ma_cnt[j] == p else np.nan
+
+        # 指数移动平均线
+        for j in range(n_ema):
+            ema_val[j], ema_wt[j] = _ewm_step(ema_val[j], ema_wt[j], x, ema_alpha[j])
+            ema_out[j, i] = ema_val[j]
+
+        # MACD
+        e_fast, w_fast = _ewm_step(e_fast, w_fast, x, a_fast)
+        e_slow, w_slow = _ewm_step(e_slow, w_slow, x, a_slow)
+        dif = e_fast - e_slow
+        e_sig, w_sig = _ewm_step(e_sig, w_sig, dif, a_sig)
+        macd_out[0, i] = dif
+        macd_out[1, i] = e_sig
+        macd_out[2, i] = 2.0 * (dif - e_sig)
+
+        # 布林带
+        if i >= boll_period:
+            old = close[i - boll_period]
+            if old == old:
+                b_cnt -= 1
+                if b_cnt == 0:
+                    b_mean = 0.0
+                    b_m2 = 0.0
+                else:
+                    d = old - b_mean
+                    b_mean -= d / b_cnt
+                    b_m2 -= d * (old - b_mean)
+        if valid:
+            b_cnt += 1
+            d = x - b_mean
+            b_mean += d / b_cnt
+            b_m2 += d * (x - b_mean)
+        if b_cnt == boll_period:
+            mid = b_mean
+            std = np.sqrt(b_m2 / (boll_period - 1)) if b_m2 > 0.0 else 0.0
+            boll_out[0, i] = mid
+            boll_out[1, i] = std
+            boll_out[2, i] = mid + boll_k * std
+            boll_out[3, i] = mid - boll_k * std
+        else:
+            for k in range(4):
+                boll_out[k, i] = np.nan
+
+
+@njit(cache=True, fastmath=_FASTMATH)
+def _macd_stream(close, a_fast, a_slow, a_sig, out_dif, out_dea, out_hist):
+    """单次遍历计算MACD：三个EMA标量状态同步递推，DIF/DEA/HIST一次写出"""
+    e_fast = np.nan
+    e_slow = np.nan
+    e_sig = np.nan
+    w_fast = 1.0
+    w_slow = 1.0
+    w_sig = 1.0
+    for i in range(close.shape[0]):
+        x = close[i]
+        e_fast, w_fast = _ewm_step(e_fast, w_fast, x, a_fast)
+        e_slow, w_slow = _ewm_step(e_slow, w_slow, x, a_slow)
+        dif = e_fast - e_slow
+        e_sig, w_sig = _ewm_step(e_sig, w_sig, dif, a_sig)
+        out_dif[i] = dif
+        out_dea[i] = e_sig
+        out_hist[i] = 2.0 * (dif - e_sig)
+
+
+@njit(cache=True, fastmath=_FASTMATH)
+def _rolling_mean(x, period, out):
+    """窗口累加和滚动均值，等价于 pandas rolling(period).mean()"""
+    s = 0.0
+    cnt = 0
+    for i in range(x.shape[0]):
+        v = x[i]
+        if v == v:
+            s += v
+            cnt += 1
+        if i >= period:
+            old = x[i - period]
+            if old == old:
+                s -= old
+                cnt -= 1
+        out[i] = s / period if cnt == period else np.nan
+
+
+@njit(cache=True, fastmath=_FASTMATH)
+def _boll_bands(x, period, k, out_mid, out_std, out_up, out_down):
+    """
+    布林带：单次遍历同时求滚动均值、样本标准差及上下轨（Welford 增删更新）
+    与 sum/sum_sq 公式相比不受 period*price^2 量级下的抵消误差影响
+    """
+    mean = 0.0
+    m2 = 0.0
+    cnt = 0
+    for i in range(x.shape[0]):
+        if i >= period:
+            old = x[i - period]
+            if old == old:
+                cnt -= 1
+                if cnt == 0:
+                    mean = 0.0
+                    m2 = 0.0
+                else:
+                    d = old - mean
+                    mean -= d / cnt
+                    m2 -= d * (old - mean)
+        v = x[i]
+        if v == v:
+            cnt += 1
+            d = v - mean
+            mean += d / cnt
+            m2 += d * (v - mean)
+        if cnt == period:
+            std = np.sqrt(m2 / (period - 1)) if m2 > 0.0 else 0.0
+            out_mid[i] = mean
+            out_std[i] = std
+            out_up[i] = mean + k * std
+            out_down[i] = mean - k * std
+        else:
+            out_mid[i] = np.nan
+            out_std[i] = np.nan
+            out_up[i] = np.nan
+            out_down[i] = np.nan
+
+
+@njit(cache=True, fastmath=_FASTMATH)
+def _kdj_smooth(close, lowest, highest, a1, a2, out_k, out_d, out_j):
+    """KDJ：RSV、K/D 两级递推平滑与 J 线在同一次遍历中完成"""
+    k = np.nan
+    d = np.nan
+    wk = 1.0
+    wd = 1.0
+    for i in range(close.shape[0]):
+        spread = highest[i] - lowest[i]
+        rsv = (close[i] - lowest[i]) / spread * 100 if spread != 0.0 else np.nan
+        k, wk = _ewm_step(k, wk, rsv, a1)
+        d, wd = _ewm_step(d, wd, k, a2)
+        out_k[i] = k
+        out_d[i] = d
+        out_j[i] = 3 * k - 2 * d
+
+
+@njit(cache=True, fastmath=_FASTMATH)
+def _sliding_extreme(a, w, out, is_max):
+    """
+    单调队列滑动窗口极值，摊还 O(n)
+    dq[head:tail] 保存窗口内候选下标（对应值单调），每个下标至多入队、出队各一次；
+    用长度 n 的线性数组代替环形缓冲区，省去每次访问的取模运算
+    窗口内存在 NaN 时输出 NaN，与 pandas rolling(min_periods=w) 一致
+    """
+    n = a.shape[0]
+    dq = np.empty(n, dtype=np.int64)
+    head = 0
+    tail = 0
+    last_nan = -w
+    for i in range(n):
+        # 弹出已滑出窗口的下标
+        while head < tail and dq[head] <= i - w:
+            head += 1
+        v = a[i]
+        if v != v:
+            last_nan = i
+        else:
+            # 弹出队尾不再可能成为极值的下标
+            if is_max:
+                while head < tail and a[dq[tail - 1]] <= v:
+                    tail -= 1
+            else:
+                while head < tail and a[dq[tail - 1]] >= v:
+                    tail -= 1
+            dq[tail] = i
+            tail += 1
+        if i >= w - 1 and i - last_nan >= w:
+            out[i] = a[dq[head]]
+        else:
+            out[i] = np.nan
+
+
+@njit(cache=True, fastmath=_FASTMATH)
+def _sliding_max(a, w, out):
+    """滑动窗口最大值"""
+    _sliding_extreme(a, w, out, True)
+
+
+@njit(cache=True, fastmath=_FASTMATH)
+def _sliding_min(a, w, out):
+    """滑动窗口最小值"""
+    _sliding_extreme(a, w, out, False)
+
+
+@njit(cache=True, fastmath=_FASTMATH)
+def _rsi_wilder(delta, period, out):
+    """
+    Wilder 平滑 RSI
+    以前 period 个涨跌幅的简单均值作为种子，
+    之后 avg = (avg * (p - 1) + x) / p 递推，O(1) 状态
+    返回末端 (平均涨幅, 平均跌幅)，供流式计算接续
+    """
+    n = delta.shape[0]
+    if n <= period:
+        out[:] = np.nan
+        return np.nan, np.nan
+    out[:period] = np.nan
+
+    avg_gain = 0.0
+    avg_loss = 0.0
+    for i in range(1, period + 1):
+        d = delta[i]
+        if d > 0:
+            avg_gain += d
+        elif d < 0:
+            avg_loss -= d
+    avg_gain /= period
+    avg_loss /= period
+
+    for i in range(period, n):
+        if i > period:
+            d = delta[i]
+            g = d if d > 0 else 0.0
+            l = -d if d < 0 else 0.0
+            avg_gain = (avg_gain * (period - 1) + g) / period
+            avg_loss = (avg_loss * (period - 1) + l) / period
+        if avg_loss > 0.0:
+            out[i] = 100.0 - 100.0 / (1.0 + avg_gain / avg_loss)
+        elif avg_gain > 0.0:
+            out[i] = 100.0
+        else:
+            out[i] = np.nan
+    return avg_gain, avg_loss
+
+
+@njit(cache=True, fastmath=_FASTMATH)
+def _hlc_kernel(high, low, close, kdj_n, kdj_a1, kdj_a2, rsi_periods, atr_period,
+                kdj_out, rsi_out, atr_out):
+    """
+    单次遍历计算依赖 high/low/close 的指标：KDJ、RSI、ATR
+    与 _close_kernel 配合，calculate_all 对整段序列只做两次遍历，
+    各指标在同一元素上连续计算，工作集始终留在缓存中，无需分块
+    状态与独立内核一致：单调队列滑动极值、Wilder 递推、窗口累加和
+    """
+    n = close.shape[0]
+    n_rsi = rsi_periods.shape[0]
+
+    # KDJ：单调队列 dq[head:tail]
+    dq_lo = np.empty(n, dtype=np.int64)
+    dq_hi = np.empty(n, dtype=np.int64)
+    lo_head = 0
+    lo_tail = 0
+    hi_head = 0
+    hi_tail = 0
+    lo_nan = -kdj_n
+    hi_nan = -kdj_n
+    k = np.nan
+    d = np.nan
+    wk = 1.0
+    wd = 1.0
+
+    # RSI：Wilder 平均涨跌幅
+    avg_gain = np.zeros(n_rsi)
+    avg_loss = np.zeros(n_rsi)
+
+    # ATR：真实波幅窗口累加和
+    tr_buf = np.empty(n)
+    tr_sum = 0.0
+    tr_cnt = 0
+
+    for i in range(n):
+        c = close[i]
+        h = high[i]
+        l = low[i]
+        prev = close[i - 1] if i > 0 else np.nan
+
+        # KDJ 滑动极值
+        while lo_head < lo_tail and dq_lo[lo_head] <= i - kdj_n:
+            lo_head += 1
+        while hi_head < hi_tail and dq_hi[hi_head] <= i - kdj_n:
+            hi_head += 1
+        if l != l:
+            lo_nan = i
+        else:
+            while lo_head < lo_tail and low[dq_lo[lo_tail - 1]] >= l:
+                lo_tail -= 1
+            dq_lo[lo_tail] = i
+            lo_tail += 1
+        if h != h:
+            hi_nan = i
+        else:
+            while hi_head < hi_tail and high[dq_hi[hi_tail - 1]] <= h:
+                hi_tail -= 1
+            dq_hi[hi_tail] = i
+            hi_tail += 1
+        lowest = low[dq_lo[lo_head]] if i >= kdj_n - 1 and i - lo_nan >= kdj_n else np.nan
+        highest = high[dq_hi[hi_head]] if i >= kdj_n - 1 and i - hi_nan >= kdj_n else np.nan
+
+        spread = highest - lowest
+        rsv = (c - lowest) / spread * 100 if spread != 0.0 else np.nan
+        k, wk = _ewm_step(k, wk, rsv, kdj_a1)
+        d, wd = _ewm_step(d, wd, k, kdj_a2)
+        kdj_out[0, i] = k
+        kdj_out[1, i] = d
+        kdj_out[2, i] = 3 * k - 2 * d
+
+        # RSI（首根K线涨跌幅记为0，与 np.diff(prepend) 一致）
+        delta = c - prev if i > 0 else 0.0
+        gain = delta if delta > 0 else 0.0
+        loss = -delta if delta < 0 else 0.0
+        for j in range(n_rsi):
+            p = rsi_periods[j]
+            if i <= p:
+                avg_gain[j] += gain if i > 0 else 0.0
+                avg_loss[j] += loss if i > 0 else 0.0
+                if i == p:
+                    avg_gain[j] /= p
+                    avg_loss[j] /= p
+            else:
+                avg_gain[j] = (avg_gain[j] * (p - 1) + gain) / p
+                avg_loss[j] = (avg_loss[j] * (p - 1) + loss) / p
+            if i < p:
+                rsi_out[j, i] = np.nan
+            elif avg_loss[j] > 0.0:
+                rsi_out[j, i] = 100.0 - 100.0 / (1.0 + avg_gain[j] / avg_loss[j])
+            elif avg_gain[j] > 0.0:
+                rsi_out[j, i] = 100.0
+            else:
+                rsi_out[j, i] = np.nan
+
+        # ATR（跳过NaN取最大，首根K线真实波幅即为 high - low）
+        tr = h - l
+        hc = abs(h - prev)
+        lc = abs(l - prev)
+        if hc > tr or tr != tr:
+            tr = hc
+        if lc > tr or tr != tr:
+            tr = lc
+        tr_buf[i] = tr
+        if tr == tr:
+            tr_sum += tr
+            tr_cnt += 1
+        if i >= atr_period:
+            old = tr_buf[i - atr_period]
+            if old == old:
+                tr_sum -= old
+                tr_cnt -= 1
+        atr_out[i] = tr_sum / atr_period if tr_cnt == atr_period else np.nan
+
+
+def compute_all(close: np.ndarray,
+                high: np.ndarray = None,
+                low: np.ndarray = None,
+                ma_periods: tuple = MA_PERIODS,
+                ema_periods: tuple = EMA_PERIODS,
+                macd: tuple = MACD_PARAMS,
+                boll: tuple = BOLL_PARAMS,
+                kdj: tuple = KDJ_PARAMS,
+                rsi_periods: tuple = RSI_PERIODS,
+                atr_period: int = ATR_PERIOD) -> dict:
+    """
+    计算全部指标
+    仅传入 close 时计算 MA/EMA/MACD/BOLL；同时传入 high/low 时追加 KDJ/RSI/ATR
+    返回 {列名: ndarray}，列名及顺序与 IndicatorEngine.calculate_all 保持一致
+    float32 输入按 float32 计算与输出（内核按签名分别编译），其余一律转为 float64
+    """
+    dtype = np.float32 if close.dtype == np.float32 else np.float64
+    close = np.ascontiguousarray(close, dtype=dtype)
+    n = close.shape[0]
+    ma_p = np.asarray(ma_periods, dtype=np.int64)
+    ema_p = np.asarray(ema_periods, dtype=np.float64)
+
+    ma_out = np.empty((len(ma_p), n), dtype=dtype)
+    ema_out = np.empty((len(ema_p), n), dtype=dtype)
+    macd_out = np.empty((3, n), dtype=dtype)
+    boll_out = np.empty((4, n), dtype=dtype)
+
+    _close_kernel(close, ma_p, ema_p, macd[0], macd[1], macd[2],
+                  boll[0], float(boll[1]), ma_out, ema_out, macd_out, boll_out)
+
+    out = {}
+    for j, p in enumerate(ma_periods):
+        out[f'ma{p}'] = ma_out[j]
+    for j, p in enumerate(ema_periods):
+        out[f'ema{p}'] = ema_out[j]
+    out['macd_dif'], out['macd_dea'], out['macd_hist'] = macd_out
+
+    if high is not None and low is not None:
+        high = np.ascontiguousarray(high, dtype=dtype)
+        low = np.ascontiguousarray(low, dtype=dtype)
+        rsi_p = np.asarray(rsi_periods, dtype=np.int64)
+        kdj_out = np.empty((3, n), dtype=dtype)
+        rsi_out = np.empty((len(rsi_p), n), dtype=dtype)
+        atr_out = np.empty(n, dtype=dtype)
+
+        _hlc_kernel(high, low, close, kdj[0], 1.0 / kdj[1], 1.0 / kdj[2], rsi_p, atr_period,
+                    kdj_out, rsi_out, atr_out)
+
+        out['kdj_k'], out['kdj_d'], out['kdj_j'] = kdj_out
+        for j, p in enumerate(rsi_periods):
+            out[f'rsi{p}'] = rsi_out[j]
+        out['boll_mid'], out['boll_std'], out['boll_up'], out['boll_down'] = boll_out
+        out[f'atr{atr_period}'] = atr_out
+    else:
+        out['boll_mid'], out['boll_std'], out['boll_up'], out['boll_down'] = boll_out
+    return out
+
+
+# 优先使用AOT编译的原生内核（python -m data_analysis.build_indicators_native 生成），
+# 免去首次调用时的JIT编译；未构建或设置 INDICATORS_JIT_ONLY 时沿用JIT版本
+def _native_kernel(native, name):
+    """按首个数组参数的dtype选择 float64/float32 原生内核"""
+    kernel_f8 = getattr(native, name)
+    kernel_f4 = getattr(native, f'{name}_f4')
+
+    def kernel(x, *args):
+        return (kernel_f4 if x.dtype == np.float32 else kernel_f8)(x, *args)
+    kernel.__name__ = name
+    return kernel
+
+
+if not os.environ.get("INDICATORS_JIT_ONLY"):
+    try:
+        from . import indicators_native as _native
+    except ImportError:
+        _native = None
+    if _native is not None:
+        _close_kernel = _native_kernel(_native, 'close_kernel')
+        _hlc_kernel = _native_kernel(_native, 'hlc_kernel')
+        _macd_stream = _native_kernel(_native, 'macd_stream')
+        _rolling_mean = _native_kernel(_native, 'rolling_mean')
+        _boll_bands = _native_kernel(_native, 'boll_bands')
+        _kdj_smooth = _native_kernel(_native, 'kdj_smooth')
+        _sliding_max = _native_kernel(_native, 'sliding_max')
+        _sliding_min = _native_kernel(_native, 'sliding_min')
+        _rsi_wilder = _native_kernel(_native, 'rsi_wilder')
@@ -7,56 +7,162 @@
 4. 网页爬虫 (备选)
 """
 
-from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
-from typing import List, Optional, Dict, Any
+from typing import Callable, List, Optional, Dict, Any, Protocol
+import functools
+import os
+import threading
+import time
+import numpy as np
 import pandas as pd
 import logging
 
+# 可选数据源SDK在模块加载时导入一次，未安装时由各适配器connect()判定不可用
+try:
+    import akshare as ak
+except ImportError:
+    ak = None
+
+try:
+    from xtquant import xtdata
+except ImportError:
+    xtdata = None
+
+try:
+    from vnpy.trader.constant import Exchange, Interval
+except ImportError:
+    Exchange = Interval = None
+
+from utils.bar_io import VNPY_BAR_FIELDS, make_bars_to_frame, write_parquet
+
 logger = logging.getLogger(__name__)
 
+# 股票代码前三位 -> 交易所（集合查找代替逐个前缀比较）
+SZ_PREFIXES = frozenset({"000", "001", "002", "300"})
+SH_PREFIXES = frozenset({"600", "601", "603", "688", "689"})
+
+
+class _TTLCache:
+    """单值TTL缓存 - 在有效期内复用上次结果，合并突发的重复请求"""
+    
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._value: Any = None
+        self._timestamp = 0.0
+        self._lock = threading.Lock()
+    
+    def get(self, loader: Callable[[], Any]) -> Any:
+        """返回缓存值，过期则调用loader刷新（loader抛出的异常不会被缓存）"""
+        with self._lock:
+            now = time.monotonic()
+            if self._value is not None and now - self._timestamp < self.ttl:
+                return self._value
+            self._value = loader()
+            self._timestamp = time.monotonic()
+            return self._value
+
+
+# 东方财富A股快照体积较大（数MB），短时间内的多次请求共用同一份
+SPOT_SNAPSHOT_TTL = 2.0
+_spot_snapshot_cache = _TTLCache(SPOT_SNAPSHOT_TTL)
+
+
+def _get_spot_snapshot() -> pd.DataFrame:
+    """获取沪深A股实时快照（带TTL缓存）"""
+    if ak is None:
+        raise ImportError("AKShare未安装")
+    return _spot_snapshot_cache.get(ak.stock_zh_a_spot_em)
+
+
+# 历史K线本地Parquet缓存目录，可通过环境变量 STOCK_BAR_CACHE 覆盖
+BAR_CACHE_DIR = os.path.expanduser(os.getenv("STOCK_BAR_CACHE", "~/.cache/stock_bars"))
+# 复权K线缓存有效期（秒）：前复权价格在每次除权除息后整体变化，过期后重新获取
+ADJUSTED_BAR_TTL = 86400
+
+
+def bar_cache(default_freq: str, ttl: Optional[float] = None):
+    """
+    K线本地缓存装饰器
+    按 (数据源, 代码, 周期, 起止时间) 缓存到Parquet文件，命中时跳过网络请求；
+    仅缓存截止日期早于今天的历史区间，避免当日未收盘数据被固化；
+    ttl 不为None时（复权数据）缓存文件超过有效期即重新获取
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(self, symbol: str, start: datetime, end: datetime, *args, **kwargs):
+            freq = args[0] if args else kwargs.get("freq", default_freq)
+            today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+            if end.replace(tzinfo=None) >= today:
+                return func(self, symbol, start, end, *args, **kwargs)
+            
+            fmt = "%Y%m%d" if freq == "1d" else "%Y%m%d%H%M"
+            path = os.path.join(
+                BAR_CACHE_DIR, self.name, freq,
+                f"{symbol}_{start.strftime(fmt)}_{end.strftime(fmt)}.parquet"
+            )
+            if os.path.exists(path) and (ttl is None or time.time() - os.path.getmtime(path) < ttl):
+                try:
+                    return pd.read_parquet(path)
+                except Exception as e:
+                    logger.warning(f"读取K线缓存失败 {path}: {e}")
+            
+            df = func(self, symbol, start, end, *args, **kwargs)
+            if not df.empty:
+                try:
+                    write_parquet(path, df)
+                except Exception as e:
+                    logger.debug(f"写入K线缓存失败 {path}: {e}")
+            return df
+        return wrapper
+    return decorator
+
 
-class DataSourceAdapter(ABC):
-    """数据源适配器基类"""
+# vn.py BarData 转DataFrame，额外保留成交额
+_bars_to_frame = make_bars_to_frame(VNPY_BAR_FIELDS + (("turnover", "turnover"),))
+
+
+class DataSourceAdapter(Protocol):
+    """
+    数据源适配器协议
+    仅用于类型标注，运行时不做检查；适配器无需继承，实现以下属性与方法即可
+    """
     
-    def __init__(self, name: str):
-        self.name = name
-        self.is_available = False
+    name: str
+    is_available: bool
     
-    @abstractmethod
     def connect(self) -> bool:
         """连接数据源"""
-        pass
+        ...
     
-    @abstractmethod
     def get_stock_list(self) -> pd.DataFrame:
         """获取股票列表"""
-        pass
+        ...
     
-    @abstractmethod
     def get_daily_bars(self, symbol: str, start: datetime, end: datetime) -> pd.DataFrame:
         """获取日K线数据"""
-        pass
+        ...
     
-    @abstractmethod
     def get_minute_bars(self, symbol: str, start: datetime, end: datetime, freq: str = "1min") -> pd.DataFrame:
         """获取分钟K线数据"""
-        pass
+        ...
     
-    @abstractmethod
     def get_realtime_quote(self, symbols: List[str]) -> pd.DataFrame:
         """获取实时行情"""
-        pass
+        ...
 
 
-class VnpyAdapter(DataSourceAdapter):
+class VnpyAdapter:
     """
     vn.py内置数据适配器
     使用新浪财经/腾讯/东方财富免费接口
     """
     
+    __slots__ = ('name', 'is_available', 'database')
+    
     def __init__(self):
-        super().__init__("vnpy_builtin")
+        self.name = "vnpy_builtin"
+        self.is_available = False
         self.database = None
     
     def connect(self) -> bool:
@@ -85,8 +191,7 @@ class VnpyAdapter(DataSourceAdapter):
         try:
             # vn.py本身不提供股票列表接口，需要从其他源获取
             # 这里可以调用akshare获取
-            import akshare as ak
-            df = ak.stock_zh_a_spot_em()
+            df = _get_spot_snapshot()
             return df[["代码", "名称"]].rename(columns={"代码": "symbol", "名称": "name"})
         except Exception as e:
             logger.error(f"获取股票列表失败: {e}")
@@ -98,10 +203,8 @@ class VnpyAdapter(DataSourceAdapter):
             return pd.DataFrame()
         
         try:
-            from vnpy.trader.constant import Exchange, Interval
-            
             # 确定交易所
-            exchange = Exchange.SZSE if symbol.startswith(("000", "001", "002", "300")) else Exchange.SSE
+            exchange = Exchange.SZSE if symbol[:3] in SZ_PREFIXES else Exchange.SSE
             
             bars = self.database.load_bar_data(
                 symbol=symbol,
@@ -114,19 +217,7 @@ class VnpyAdapter(DataSourceAdapter):
             if not bars:
                 return pd.DataFrame()
             
-            data = []
-            for bar in bars:
-                data.append({
-                    "datetime": bar.datetime,
-                    "open": bar.open_price,
-                    "high": bar.high_price,
-                    "low": bar.low_price,
-                    "close": bar.close_price,
-                    "volume": bar.volume,
-                    "turnover": bar.turnover
-                })
-            
-            return pd.DataFrame(data)
+            return _bars_to_frame(bars)
         except Exception as e:
             logger.error(f"获取日K线失败 {symbol}: {e}")
             return pd.DataFrame()
@@ -137,9 +228,7 @@ class VnpyAdapter(DataSourceAdapter):
             return pd.DataFrame()
         
         try:
-            from vnpy.trader.constant import Exchange, Interval
-            
-            exchange = Exchange.SZSE if symbol.startswith(("000", "001", "002", "300")) else Exchange.SSE
+            exchange = Exchange.SZSE if symbol[:3] in SZ_PREFIXES else Exchange.SSE
             
             interval_map = {
                 "1min": Interval.MINUTE,
@@ -160,19 +249,7 @@ class VnpyAdapter(DataSourceAdapter):
             if not bars:
                 return pd.DataFrame()
             
-            data = []
-            for bar in bars:
-                data.append({
-                    "datetime": bar.datetime,
-                    "open": bar.open_price,
-                    "high": bar.high_price,
-                    "low": bar.low_price,
-                    "close": bar.close_price,
-                    "volume": bar.volume,
-                    "turnover": bar.turnover
-                })
-            
-            return pd.DataFrame(data)
+            return _bars_to_frame(bars)
         except Exception as e:
             logger.error(f"获取分钟K线失败 {symbol}: {e}")
             return pd.DataFrame()
@@ -180,8 +257,7 @@ class VnpyAdapter(DataSourceAdapter):
     def get_realtime_quote(self, symbols: List[str]) -> pd.DataFrame:
         """获取实时行情 - vn.py需通过gateway，这里使用akshare作为补充"""
         try:
-            import akshare as ak
-            df = ak.stock_zh_a_spot_em()
+            df = _get_spot_snapshot()
             df = df[df["代码"].isin(symbols)]
             return df
         except Exception as e:
@@ -189,21 +265,26 @@ class VnpyAdapter(DataSourceAdapter):
             return pd.DataFrame()
 
 
-class AkshareAdapter(DataSourceAdapter):
+class AkshareAdapter:
     """
     AKShare数据适配器
     完全免费的开源金融数据接口
     """
     
+    __slots__ = ('name', 'is_available')
+    
     def __init__(self):
-        super().__init__("akshare")
+        self.name = "akshare"
+        self.is_available = False
     
     def connect(self) -> bool:
-        """AKShare无需连接，直接可用"""
+        """AKShare无需连接，直接可用（仅检查SDK，不拉取全量快照）"""
+        if ak is None:
+            logger.warning("AKShare未安装，跳过")
+            self.is_available = False
+            return False
         try:
-            import akshare as ak
-            # 测试接口
-            _ = ak.stock_zh_a_spot_em()
+            logger.debug(f"AKShare版本: {ak.__version__}")
             self.is_available = True
             logger.info("AKShare适配器可用")
             return True
@@ -215,8 +296,7 @@ class AkshareAdapter(DataSourceAdapter):
     def get_stock_list(self) -> pd.DataFrame:
         """获取沪深A股列表"""
         try:
-            import akshare as ak
-            df = ak.stock_zh_a_spot_em()
+            df = _get_spot_snapshot()
             df = df.rename(columns={
                 "代码": "symbol",
                 "名称": "name",
@@ -229,11 +309,10 @@ class AkshareAdapter(DataSourceAdapter):
             logger.error(f"AKShare获取股票列表失败: {e}")
             return pd.DataFrame()
     
+    @bar_cache("1d", ttl=ADJUSTED_BAR_TTL)
     def get_daily_bars(self, symbol: str, start: datetime, end: datetime) -> pd.DataFrame:
         """获取日K线数据"""
         try:
-            import akshare as ak
-            
             start_str = start.strftime("%Y%m%d")
             end_str = end.strftime("%Y%m%d")
             
@@ -264,11 +343,10 @@ class AkshareAdapter(DataSourceAdapter):
             logger.error(f"AKShare获取日K线失败 {symbol}: {e}")
             return pd.DataFrame()
     
+    @bar_cache("1min", ttl=ADJUSTED_BAR_TTL)
     def get_minute_bars(self, symbol: str, start: datetime, end: datetime, freq: str = "1min") -> pd.DataFrame:
         """获取分钟K线数据"""
         try:
-            import akshare as ak
-            
             period_map = {
                 "1min": "1",
                 "5min": "5",
@@ -309,8 +387,7 @@ class AkshareAdapter(DataSourceAdapter):
     def get_realtime_quote(self, symbols: List[str]) -> pd.DataFrame:
         """获取实时行情"""
         try:
-            import akshare as ak
-            df = ak.stock_zh_a_spot_em()
+            df = _get_spot_snapshot()
             df = df[df["代码"].isin(symbols)]
             return df
         except Exception as e:
@@ -318,30 +395,34 @@ class AkshareAdapter(DataSourceAdapter):
             return pd.DataFrame()
 
 
-class MiniQMTAdapter(DataSourceAdapter):
+class MiniQMTAdapter:
     """
     MiniQMT数据适配器
     需要开通QMT权限的券商账户
     """
     
+    __slots__ = ('name', 'is_available', 'connected', '_lock')
+    
     def __init__(self):
-        super().__init__("miniqmt")
+        self.name = "miniqmt"
+        self.is_available = False
         self.connected = False
+        # xtquant 并非在所有版本下都线程安全，批量并发请求时串行访问
+        self._lock = threading.Lock()
     
     def connect(self) -> bool:
         """连接MiniQMT"""
+        if xtdata is None:
+            logger.warning("MiniQMT SDK未安装，跳过")
+            self.is_available = False
+            return False
         try:
-            from xtquant import xtdata
             # 测试连接
             xtdata.get_stock_list_in_sector("沪深A股")
             self.is_available = True
             self.connected = True
             logger.info("MiniQMT连接成功")
             return True
-        except ImportError:
-            logger.warning("MiniQMT SDK未安装，跳过")
-            self.is_available = False
-            return False
         except Exception as e:
             logger.error(f"MiniQMT连接失败: {e}")
             self.is_available = False
@@ -353,7 +434,6 @@ class MiniQMTAdapter(DataSourceAdapter):
             return pd.DataFrame()
         
         try:
-            from xtquant import xtdata
             stocks = xtdata.get_stock_list_in_sector("沪深A股")
             # 转换为DataFrame
             data = []
@@ -366,25 +446,25 @@ class MiniQMTAdapter(DataSourceAdapter):
             logger.error(f"MiniQMT获取股票列表失败: {e}")
             return pd.DataFrame()
     
+    @bar_cache("1d")
     def get_daily_bars(self, symbol: str, start: datetime, end: datetime) -> pd.DataFrame:
         """获取日K线数据"""
         if not self.connected:
             return pd.DataFrame()
         
         try:
-            from xtquant import xtdata
-            
-            exchange = "SH" if symbol.startswith(("600", "601", "603", "688", "689")) else "SZ"
+            exchange = "SH" if symbol[:3] in SH_PREFIXES else "SZ"
             full_symbol = f"{symbol}.{exchange}"
             
             start_str = start.strftime("%Y%m%d")
             end_str = end.strftime("%Y%m%d")
             
-            # 下载历史数据
-            xtdata.download_history_data(full_symbol, "1d", start_str, end_str)
-            
-            # 获取数据
-            data = xtdata.get_local_data([full_symbol], "1d", start_str, end_str)
+            with self._lock:
+                # 下载历史数据
+                xtdata.download_history_data(full_symbol, "1d", start_str, end_str)
+                
+                # 获取数据
+                data = xtdata.get_local_data([full_symbol], "1d", start_str, end_str)
             
             if data.empty:
                 return pd.DataFrame()
@@ -404,15 +484,14 @@ class MiniQMTAdapter(DataSourceAdapter):
             logger.error(f"MiniQMT获取日K线失败 {symbol}: {e}")
             return pd.DataFrame()
     
+    @bar_cache("1min")
     def get_minute_bars(self, symbol: str, start: datetime, end: datetime, freq: str = "1min") -> pd.DataFrame:
         """获取分钟K线数据"""
         if not self.connected:
             return pd.DataFrame()
         
         try:
-            from xtquant import xtdata
-            
-            exchange = "SH" if symbol.startswith(("600", "601", "603", "688", "689")) else "SZ"
+            exchange = "SH" if symbol[:3] in SH_PREFIXES else "SZ"
             full_symbol = f"{symbol}.{exchange}"
             
             period_map = {
@@ -427,8 +506,9 @@ class MiniQMTAdapter(DataSourceAdapter):
             end_str = end.strftime("%Y%m%d")
             period = period_map.get(freq, "1m")
             
-            xtdata.download_history_data(full_symbol, period, start_str, end_str)
-            data = xtdata.get_local_data([full_symbol], period, start_str, end_str)
+            with self._lock:
+                xtdata.download_history_data(full_symbol, period, start_str, end_str)
+                data = xtdata.get_local_data([full_symbol], period, start_str, end_str)
             
             if data.empty:
                 return pd.DataFrame()
@@ -445,25 +525,26 @@ class MiniQMTAdapter(DataSourceAdapter):
             return pd.DataFrame()
         
         try:
-            from xtquant import xtdata
-            
-            full_symbols = []
-            for s in symbols:
-                exchange = "SH" if s.startswith(("600", "601", "603", "688")) else "SZ"
-                full_symbols.append(f"{s}.{exchange}")
-            
-            data = xtdata.get_full_tick(full_symbols)
-            
-            # 转换为DataFrame
-            records = []
-            for symbol, tick in data.items():
-                records.append({
-                    "symbol": symbol.split(".")[0],
-                    "price": tick["lastPrice"],
-                    "volume": tick["volume"]
-                })
-            
-            return pd.DataFrame(records)
+            full_symbols = [f"{s}.SH" if s[:3] in SH_PREFIXES else f"{s}.SZ" for s in symbols]
+            
+            with self._lock:
+                data = xtdata.get_full_tick(full_symbols)
+            
+            # 转换为DataFrame：按已知数量预分配列数组并逐个填充
+            n = len(data)
+            codes = np.empty(n, dtype=object)
+            prices = np.empty(n, dtype=np.float64)
+            volumes = np.empty(n, dtype=np.int64)
+            for i, (symbol, tick) in enumerate(data.items()):
+                codes[i] = symbol.split(".")[0]
+                prices[i] = tick["lastPrice"]
+                volumes[i] = tick["volume"]
+            
+            return pd.DataFrame({
+                "symbol": codes,
+                "price": prices,
+                "volume": volumes
+            }, copy=False)
         except Exception as e:
             logger.error(f"MiniQMT获取实时行情失败: {e}")
             return pd.DataFrame()
@@ -482,6 +563,8 @@ class DataManager:
             AkshareAdapter(),   # 优先级3
         ]
         self._init_adapters()
+        self.adapter = self._get_available_adapter()
+        self._bind_adapter()
     
     def _init_adapters(self):
         """初始化所有适配器"""
@@ -495,35 +578,65 @@ class DataManager:
                 return adapter
         return None
     
+    def _bind_adapter(self):
+        """
+        将选定适配器的方法直接绑定到实例上
+        调用时不再逐个扫描适配器；无可用数据源时保留下方的类方法作为兜底
+        """
+        if self.adapter is None:
+            logger.error("没有可用的数据源")
+            return
+        self.get_stock_list = self.adapter.get_stock_list
+        self.get_daily_bars = self.adapter.get_daily_bars
+        self.get_minute_bars = self.adapter.get_minute_bars
+        self.get_realtime_quote = self.adapter.get_realtime_quote
+    
     def get_stock_list(self) -> pd.DataFrame:
         """获取股票列表"""
-        adapter = self._get_available_adapter()
-        if adapter:
-            return adapter.get_stock_list()
         logger.error("没有可用的数据源")
         return pd.DataFrame()
     
     def get_daily_bars(self, symbol: str, start: datetime, end: datetime) -> pd.DataFrame:
         """获取日K线数据"""
-        adapter = self._get_available_adapter()
-        if adapter:
-            return adapter.get_daily_bars(symbol, start, end)
         logger.error("没有可用的数据源")
         return pd.DataFrame()
     
+    def get_daily_bars_batch(self, symbols: List[str], start: datetime, end: datetime,
+                             max_workers: int = 16) -> Dict[str, pd.DataFrame]:
+        """
+        批量获取多只股票日K线
+        各数据源均为网络/RPC请求，使用线程池并发以重叠网络往返延迟
+        """
+        adapter = self.adapter
+        if not adapter:
+            logger.error("没有可用的数据源")
+            return {}
+        if not symbols:
+            return {}
+        
+        results: Dict[str, pd.DataFrame] = {}
+        workers = min(max_workers, len(symbols))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                executor.submit(adapter.get_daily_bars, symbol, start, end): symbol
+                for symbol in symbols
+            }
+            for future in as_completed(futures):
+                symbol = futures[future]
+                try:
+                    results[symbol] = future.result()
+                except Exception as e:
+                    logger.error(f"批量获取日K线失败 {symbol}: {e}")
+                    results[symbol] = pd.DataFrame()
+        return results
+    
     def get_minute_bars(self, symbol: str, start: datetime, end: datetime, freq: str = "1min") -> pd.DataFrame:
         """获取分钟K线数据"""
-        adapter = self._get_available_adapter()
-        if adapter:
-            return adapter.get_minute_bars(symbol, start, end, freq)
         logger.error("没有可用的数据源")
         return pd.DataFrame()
     
     def get_realtime_quote(self, symbols: List[str]) -> pd.DataFrame:
         """获取实时行情"""
-        adapter = self._get_available_adapter()
-        if adapter:
-            return adapter.get_realtime_quote(symbols)
         logger.error("没有可用的数据源")
         return pd.DataFrame()
 
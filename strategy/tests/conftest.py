@@ -0,0 +1,5 @@
+"""测试公共配置：以 strategy 目录为导入根，与各模块的运行方式一致"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,52 @@
+"""data_collector.manager K线缓存装饰器"""
+import os
+import time
+from datetime import datetime
+
+import pandas as pd
+import pytest
+
+from data_collector import manager
+
+pytest.importorskip("pyarrow")
+
+
+class FakeAdapter:
+    name = "fake"
+    
+    def __init__(self):
+        self.calls = []
+    
+    @manager.bar_cache("1d", ttl=100)
+    def get_adjusted(self, symbol, start, end):
+        self.calls.append("adjusted")
+        return pd.DataFrame({"close": [1.0]})
+    
+    @manager.bar_cache("1d")
+    def get_raw(self, symbol, start, end):
+        self.calls.append("raw")
+        return pd.DataFrame({"close": [1.0]})
+
+
+def _age_cache_files(root, seconds):
+    for dirpath, _, files in os.walk(root):
+        for name in files:
+            path = os.path.join(dirpath, name)
+            past = time.time() - seconds
+            os.utime(path, (past, past))
+
+
+def test_adjusted_bars_expire_raw_bars_do_not(tmp_path, monkeypatch):
+    monkeypatch.setattr(manager, "BAR_CACHE_DIR", str(tmp_path))
+    adapter = FakeAdapter()
+    start, end = datetime(2024, 1, 1), datetime(2024, 2, 1)
+    
+    for _ in range(2):
+        adapter.get_adjusted("000001", start, end)
+        adapter.get_raw("000002", start, end)
+    assert adapter.calls == ["adjusted", "raw"]
+    
+    _age_cache_files(tmp_path, 1000)
+    adapter.get_adjusted("000001", start, end)
+    adapter.get_raw("000002", start, end)
+    assert adapter.calls == ["adjusted", "raw", "adjusted"]
@@ -0,0 +1,148 @@
+"""utils.data_loader 日K获取与缓存"""
+import os
+
+import pandas as pd
+import pytest
+
+from utils import data_loader
+from utils.data_loader import DataLoader, MiniQMTAdapter
+
+pytest.importorskip("pyarrow")
+
+
+def _epoch_ms(dates):
+    """北京时间零点对应的UTC毫秒时间戳（xtquant time 列格式）"""
+    index = pd.DatetimeIndex(dates).tz_localize('Asia/Shanghai').tz_convert('UTC')
+    return index.as_unit('ms').asi8
+
+
+class FakeXtdata:
+    """按 xtquant 接口返回 time 为毫秒时间戳的日K"""
+    
+    def __init__(self, dates):
+        self.dates = dates
+        self.calls = 0
+        self.ranges = []
+    
+    def _frame(self):
+        n = len(self.dates)
+        return pd.DataFrame({
+            'time': _epoch_ms(self.dates),
+            'open': [10.0] * n, 'high': [11.0] * n, 'low': [9.0] * n,
+            'close': [10.5] * n, 'volume': [1000.0] * n,
+        })
+    
+    def download_history_data(self, symbol, period, start, end):
+        self.calls += 1
+        self.ranges.append((start, end))
+    
+    def download_history_data2(self, symbols, period, start, end):
+        self.calls += 1
+    
+    def get_local_data(self, symbol, period, start, end):
+        return self._frame().to_dict('list')
+    
+    def get_market_data_ex(self, fields, stock_list, period, start_time, end_time):
+        return {symbol: self._frame().set_index('time', drop=False) for symbol in stock_list}
+
+
+def _make_adapter(xt) -> MiniQMTAdapter:
+    adapter = object.__new__(MiniQMTAdapter)
+    adapter.qmt_path = None
+    adapter._xt = xt
+    adapter.available = True
+    return adapter
+
+
+def _make_loader(tmp_path, adapter, **kwargs) -> DataLoader:
+    loader = DataLoader(cache_dir=str(tmp_path), **kwargs)
+    loader._factories = {'miniqmt': lambda: adapter}
+    loader.priority = ['miniqmt']
+    return loader
+
+
+DATES = ['2024-01-02', '2024-01-03', '2024-01-04', '2024-01-05']
+
+
+def test_miniqmt_epoch_ms_time_parsed_as_dates():
+    adapter = _make_adapter(FakeXtdata(DATES))
+    single = adapter.get_daily_bars('000001.SZ', '20240101', '20240110')
+    batch = adapter.get_daily_bars_many(['000001.SZ'], '20240101', '20240110')['000001.SZ']
+    for df in (single, batch):
+        days = df['datetime'].dt.tz_localize(None).dt.strftime('%Y-%m-%d').tolist()
+        assert days == DATES
+
+
+def test_miniqmt_batch_slices_and_caches(tmp_path):
+    xt = FakeXtdata(DATES)
+    result = _make_loader(tmp_path, _make_adapter(xt)).download_daily_bars_batch(
+        ['000001.SZ'], '20240103', '20240104')
+    assert len(result['000001.SZ']) == 2
+    assert os.path.exists(tmp_path / '000001.SZ.parquet')
+    
+    calls = xt.calls
+    cached = _make_loader(tmp_path, _make_adapter(xt)).download_daily_bars_batch(
+        ['000001.SZ'], '20240103', '20240104')
+    assert len(cached['000001.SZ']) == 2
+    assert xt.calls == calls
+
+
+def test_empty_slice_not_recorded_as_covered(tmp_path):
+    # 数据源返回的K线全部落在请求区间之外
+    xt = FakeXtdata(['2023-06-01', '2023-06-02'])
+    loader = _make_loader(tmp_path, _make_adapter(xt))
+    assert loader.download_daily_bars_batch(['000001.SZ'], '20240101', '20240110') == {}
+    assert not os.path.exists(tmp_path / '000001.SZ.parquet')
+    
+    xt.dates = DATES
+    result = _make_loader(tmp_path, _make_adapter(xt)).download_daily_bars_batch(
+        ['000001.SZ'], '20240101', '20240110')
+    assert len(result['000001.SZ']) == 4
+
+
+def test_cached_range_read_without_refetch(tmp_path):
+    xt = FakeXtdata(DATES)
+    loader = _make_loader(tmp_path, _make_adapter(xt))
+    assert len(loader.get_daily_bars('000001.SZ', '20240101', '20240110')) == 4
+    calls = xt.calls
+    assert len(_make_loader(tmp_path, _make_adapter(xt)).get_daily_bars(
+        '000001.SZ', '20240102', '20240103')) == 2
+    assert xt.calls == calls
+
+
+def test_expired_cache_refetches_whole_covered_range(tmp_path):
+    xt = FakeXtdata(DATES)
+    _make_loader(tmp_path, _make_adapter(xt)).get_daily_bars('000001.SZ', '20240101', '20240110')
+    
+    # 有效期内命中本地文件
+    calls = xt.calls
+    fresh = _make_loader(tmp_path, _make_adapter(xt))
+    assert len(fresh.get_daily_bars('000001.SZ', '20240103', '20240104')) == 2
+    assert xt.calls == calls
+    
+    # 过期后按文件原覆盖区间整段重新获取
+    expired = _make_loader(tmp_path, _make_adapter(xt), bar_ttl=0)
+    assert len(expired.get_daily_bars('000001.SZ', '20240103', '20240104')) == 2
+    assert xt.ranges[-1] == ('20240101', '20240110')
+
+
+def test_expired_memory_entry_not_served(tmp_path):
+    xt = FakeXtdata(DATES)
+    loader = _make_loader(tmp_path, _make_adapter(xt), bar_ttl=0)
+    loader.get_daily_bars('000001.SZ', '20240101', '20240110')
+    calls = xt.calls
+    loader.get_daily_bars('000001.SZ', '20240101', '20240110')
+    assert xt.calls == calls + 1
+
+
+def test_legacy_file_without_fetch_time_is_expired(tmp_path):
+    pa = pytest.importorskip("pyarrow")
+    pq = pytest.importorskip("pyarrow.parquet")
+    df = pd.DataFrame({'datetime': pd.to_datetime(DATES), 'close': [1.0, 2.0, 3.0, 4.0]})
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    table = table.replace_schema_metadata({data_loader._RANGE_KEY: b"20240101-20240110"})
+    pq.write_table(table, str(tmp_path / '000001.SZ.parquet'))
+    
+    xt = FakeXtdata(DATES)
+    _make_loader(tmp_path, _make_adapter(xt)).get_daily_bars('000001.SZ', '20240101', '20240110')
+    assert xt.calls == 1
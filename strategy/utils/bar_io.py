@@ -0,0 +1,78 @@
+"""
+K线数据读写公共函数
+vn.py BarData 列表转DataFrame、Parquet原子写入，供 utils.data_loader 与 data_collector 共用
+"""
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow.parquet as pq
+except ImportError:
+    pq = None
+
+
+# vn.py BarData 属性 -> DataFrame 列名（首列为时间，其余为数值列）
+VNPY_BAR_FIELDS = (
+    ('datetime', 'datetime'),
+    ('open', 'open_price'),
+    ('high', 'high_price'),
+    ('low', 'low_price'),
+    ('close', 'close_price'),
+    ('volume', 'volume'),
+)
+
+
+def make_bar_packer(fields: tuple):
+    """
+    按字段表生成专用的K线打包函数
+    循环体展开为逐属性直接赋值到各列list，返回各列组成的元组
+    """
+    columns = [f"col{j}" for j in range(len(fields))]
+    lines = ["def _pack_bars(bars):", "    n = len(bars)"]
+    lines += [f"    {col} = [None] * n" for col in columns]
+    lines.append("    for i, bar in enumerate(bars):")
+    lines += [f"        {col}[i] = bar.{attr}" for col, (_, attr) in zip(columns, fields)]
+    lines.append(f"    return ({', '.join(columns)},)")
+    
+    namespace = {}
+    exec(compile("\n".join(lines), "<bar_packer>", "exec"), namespace)
+    return namespace["_pack_bars"]
+
+
+def make_bars_to_frame(fields: tuple = VNPY_BAR_FIELDS):
+    """
+    按字段表生成 BarData列表 -> DataFrame 的转换函数
+    由生成的专用函数单次遍历取出各列，再整列转为定类型数组
+    """
+    pack_bars = make_bar_packer(fields)
+    names = [name for name, _ in fields]
+    
+    def bars_to_frame(bars: list) -> pd.DataFrame:
+        datetimes, *values = pack_bars(bars)
+        columns = {names[0]: pd.to_datetime(datetimes)}  # 保留时区信息，交由pandas解析
+        for name, column in zip(names[1:], values):
+            columns[name] = np.asarray(column, dtype=np.float64)
+        return pd.DataFrame(columns, copy=False)
+    
+    return bars_to_frame
+
+
+def write_parquet(path: str, data):
+    """
+    写入Parquet（zstd压缩），data 为 pyarrow.Table 或 DataFrame
+    先写临时文件再原子替换，并发读取时不会读到写了一半的文件
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        if isinstance(data, pd.DataFrame):
+            data.to_parquet(tmp_path, compression="zstd", index=False)
+        else:
+            pq.write_table(data, tmp_path, compression="zstd")
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
@@ -2,14 +2,120 @@
 数据加载器 - 免费数据源适配器
 优先顺序：vn.py内置 -> MiniQMT -> AKShare -> 爬虫
 """
+import functools
 import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
-from typing import List, Optional
+from typing import Dict, List, Optional, Tuple
+import logging
 import pandas as pd
 
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+from .bar_io import make_bars_to_frame, write_parquet
+
+logger = logging.getLogger(__name__)
+
+# 日K本地缓存目录（每只股票一个Parquet文件），可通过环境变量 STOCKDS_CACHE 覆盖
+CACHE_DIR = os.path.expanduser(os.getenv("STOCKDS_CACHE", "~/.cache/stockds"))
+# Parquet元数据中记录文件已覆盖的日期区间 "YYYYMMDD-YYYYMMDD"
+_RANGE_KEY = b"stockds_range"
+# Parquet元数据中记录获取时间（Unix秒）
+_FETCHED_KEY = b"stockds_fetched"
+# 日K缓存有效期（秒）：前复权（qfq）价格在每次除权除息后整体变化，
+# 超过有效期的缓存按原覆盖区间整段重新获取，使整个文件保持同一复权基准
+DAILY_BAR_TTL = 86400
+# 股票列表缓存有效期（秒），内存与本地文件共用
+STOCK_LIST_TTL = 86400
+
+
+@functools.lru_cache(maxsize=1024)
+def _parse_date(date_str: str) -> datetime:
+    """解析 YYYYMMDD 日期（批量回填时起止日期高度重复，缓存解析结果）"""
+    return datetime.strptime(date_str, "%Y%m%d")
+
+
+def _slice_dates(df: pd.DataFrame, start: str, end: str) -> pd.DataFrame:
+    """按 YYYYMMDD 起止日期截取K线（含两端）"""
+    ts = pd.to_datetime(df['datetime'])
+    if ts.dt.tz is not None:
+        ts = ts.dt.tz_localize(None)
+    mask = (ts >= pd.Timestamp(start)) & (ts < pd.Timestamp(end) + pd.Timedelta(days=1))
+    return df.loc[mask.to_numpy()].reset_index(drop=True)
+
+
+def _from_xt_time(values: pd.Series) -> pd.Series:
+    """xtquant 的 time 列为UTC毫秒时间戳，转为北京时间"""
+    return pd.to_datetime(values, unit='ms', utc=True).dt.tz_convert('Asia/Shanghai')
+
+
+def _read_bar_file(path: str) -> Tuple[Optional[pd.DataFrame], str, str, float]:
+    """
+    读取单只股票的日K缓存文件，返回 (数据, 覆盖起始日, 覆盖截止日, 获取时间)
+    未记录获取时间的旧文件按已过期处理
+    """
+    if pq is None or not os.path.exists(path):
+        return None, "", "", 0.0
+    try:
+        table = pq.read_table(path)
+        metadata = table.schema.metadata or {}
+        cached_start, cached_end = metadata.get(_RANGE_KEY, b"-").decode().split("-")
+        fetched_at = float(metadata.get(_FETCHED_KEY, b"0"))
+        return table.to_pandas(), cached_start, cached_end, fetched_at
+    except Exception as e:
+        logger.warning(f"读取日K缓存失败 {path}: {e}")
+        return None, "", "", 0.0
+
+
+def _write_bar_file(path: str, df: pd.DataFrame, start: str, end: str, fetched_at: float):
+    """写入日K缓存文件，并在元数据中记录覆盖区间与获取时间（先写临时文件再原子替换）"""
+    if pq is None:
+        return
+    try:
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        metadata = {
+            **(table.schema.metadata or {}),
+            _RANGE_KEY: f"{start}-{end}".encode(),
+            _FETCHED_KEY: repr(fetched_at).encode(),
+        }
+        write_parquet(path, table.replace_schema_metadata(metadata))
+    except Exception as e:
+        logger.debug(f"写入日K缓存失败 {path}: {e}")
+
+
+def _fetch_concurrently(fetch, symbols: List[str], workers: int) -> Dict[str, pd.DataFrame]:
+    """
+    线程池并发执行 fetch(symbol)，返回 {代码: 数据}
+    单只股票抛出异常时记录日志并记为空DataFrame，不影响其余股票
+    """
+    if not symbols:
+        return {}
+    
+    results: Dict[str, pd.DataFrame] = {}
+    with ThreadPoolExecutor(max_workers=min(workers, len(symbols))) as executor:
+        futures = {executor.submit(fetch, symbol): symbol for symbol in symbols}
+        for future in as_completed(futures):
+            symbol = futures[future]
+            try:
+                results[symbol] = future.result()
+            except Exception as e:
+                logger.warning(f"获取 {symbol} 日K数据失败: {e}")
+                results[symbol] = pd.DataFrame()
+    return results
+
 
 class DataSourceAdapter:
-    """数据源适配器基类"""
+    """数据源适配器基类（各适配器使用 __slots__，实例不带 __dict__）"""
+    
+    __slots__ = ()
     
     def get_stock_list(self) -> pd.DataFrame:
         raise NotImplementedError
@@ -19,11 +125,25 @@ class DataSourceAdapter:
     
     def get_minute_bars(self, symbol: str, start: str, end: str, freq: str = "1min") -> pd.DataFrame:
         raise NotImplementedError
+    
+    def get_daily_bars_many(self, symbols: List[str], start: str, end: str) -> Dict[str, pd.DataFrame]:
+        """批量获取日K数据，默认逐只获取；返回 {代码: 数据}，仅包含获取成功的股票"""
+        result = {}
+        for symbol in symbols:
+            df = self.get_daily_bars(symbol, start, end)
+            if not df.empty:
+                result[symbol] = df
+        return result
+
+
+_bars_to_frame = make_bars_to_frame()
 
 
 class VnpyAdapter(DataSourceAdapter):
     """vn.py内置数据源适配器"""
     
+    __slots__ = ('db', 'Exchange', 'Interval', '_ex_by_suffix', 'available')
+    
     def __init__(self):
         try:
             from vnpy.trader.database import get_database
@@ -33,9 +153,12 @@ class VnpyAdapter(DataSourceAdapter):
             self.db = get_database()
             self.Exchange = Exchange
             self.Interval = Interval
+            # 代码后缀 -> 交易所，一次建好；同时兼容 000001.SZSE 这类vn.py原生写法
+            self._ex_by_suffix = {exchange.name: exchange for exchange in Exchange}
+            self._ex_by_suffix.update({'SZ': Exchange.SZSE, 'SH': Exchange.SSE, 'BJ': Exchange.BSE})
             self.available = True
         except Exception as e:
-            print(f"vn.py数据源不可用: {e}")
+            logger.warning(f"vn.py数据源不可用: {e}")
             self.available = False
     
     def get_stock_list(self) -> pd.DataFrame:
@@ -54,38 +177,33 @@ class VnpyAdapter(DataSourceAdapter):
         
         try:
             # 解析symbol (格式: 000001.SZ)
-            code, exchange_str = symbol.split(".")
-            exchange = getattr(self.Exchange, exchange_str)
+            code, suffix = symbol.rsplit(".", 1)
+            exchange = self._ex_by_suffix[suffix]
             
             bars = self.db.load_bar_data(
                 symbol=code,
                 exchange=exchange,
                 interval=self.Interval.DAILY,
-                start=datetime.strptime(start, "%Y%m%d"),
-                end=datetime.strptime(end, "%Y%m%d")
+                start=_parse_date(start),
+                end=_parse_date(end)
             )
             
             if bars:
-                df = pd.DataFrame([{
-                    'datetime': bar.datetime,
-                    'open': bar.open_price,
-                    'high': bar.high_price,
-                    'low': bar.low_price,
-                    'close': bar.close_price,
-                    'volume': bar.volume,
-                } for bar in bars])
-                return df
+                return _bars_to_frame(bars)
             return pd.DataFrame()
         except Exception as e:
-            print(f"vn.py获取数据失败: {e}")
+            logger.warning(f"vn.py获取数据失败: {e}")
             return pd.DataFrame()
 
 
 class MiniQMTAdapter(DataSourceAdapter):
     """MiniQMT数据源适配器"""
     
+    __slots__ = ('qmt_path', '_xt', 'available')
+    
     def __init__(self, qmt_path: Optional[str] = None):
         self.qmt_path = qmt_path or os.getenv("QMT_PATH")
+        self._xt = None
         self.available = self._check_available()
     
     def _check_available(self) -> bool:
@@ -94,9 +212,10 @@ class MiniQMTAdapter(DataSourceAdapter):
             if self.qmt_path:
                 sys.path.append(self.qmt_path)
             from xtquant import xtdata
+            self._xt = xtdata  # 绑定模块，取数方法中不再重复import
             return True
         except ImportError:
-            print("MiniQMT不可用，请检查QMT安装路径")
+            logger.warning("MiniQMT不可用，请检查QMT安装路径")
             return False
     
     def get_stock_list(self) -> pd.DataFrame:
@@ -105,12 +224,11 @@ class MiniQMTAdapter(DataSourceAdapter):
             return pd.DataFrame()
         
         try:
-            from xtquant import xtdata
-            stocks = xtdata.get_stock_list_in_sector('沪深A股')
+            stocks = self._xt.get_stock_list_in_sector('沪深A股')
             df = pd.DataFrame({'symbol': stocks})
             return df
         except Exception as e:
-            print(f"MiniQMT获取股票列表失败: {e}")
+            logger.warning(f"MiniQMT获取股票列表失败: {e}")
             return pd.DataFrame()
     
     def get_daily_bars(self, symbol: str, start: str, end: str) -> pd.DataFrame:
@@ -119,10 +237,9 @@ class MiniQMTAdapter(DataSourceAdapter):
             return pd.DataFrame()
         
         try:
-            from xtquant import xtdata
             # MiniQMT格式: 000001.SZ
-            xtdata.download_history_data(symbol, '1d', start, end)
-            data = xtdata.get_local_data(symbol, '1d', start, end)
+            self._xt.download_history_data(symbol, '1d', start, end)
+            data = self._xt.get_local_data(symbol, '1d', start, end)
             
             if data and len(data) > 0:
                 df = pd.DataFrame(data)
@@ -134,25 +251,63 @@ class MiniQMTAdapter(DataSourceAdapter):
                     'close': 'close',
                     'volume': 'volume',
                 }, inplace=True)
+                df['datetime'] = _from_xt_time(df['datetime'])
                 return df
             return pd.DataFrame()
         except Exception as e:
-            print(f"MiniQMT获取数据失败: {e}")
+            logger.warning(f"MiniQMT获取数据失败: {e}")
             return pd.DataFrame()
+    
+    def get_daily_bars_many(self, symbols: List[str], start: str, end: str) -> Dict[str, pd.DataFrame]:
+        """批量获取日K数据：一次批量下载 + 一次批量读取本地数据"""
+        if not self.available or not symbols:
+            return {}
+        
+        try:
+            self._xt.download_history_data2(symbols, '1d', start, end)
+            data = self._xt.get_market_data_ex(
+                ['time', 'open', 'high', 'low', 'close', 'volume'],
+                stock_list=symbols, period='1d', start_time=start, end_time=end
+            )
+            result = {}
+            for symbol, df in data.items():
+                if df is not None and len(df) > 0:
+                    df = df.reset_index(drop=True).rename(columns={'time': 'datetime'})
+                    df['datetime'] = _from_xt_time(df['datetime'])
+                    result[symbol] = df
+            return result
+        except Exception as e:
+            logger.warning(f"MiniQMT批量获取数据失败: {e}")
+            return {}
 
 
 class AKShareAdapter(DataSourceAdapter):
     """AKShare数据源适配器"""
     
+    __slots__ = ('_ak', 'available')
+    
+    # 日K列名映射（AKShare中文列名 -> 统一列名），其余列不保留
+    DAILY_COLUMNS = {
+        '日期': 'datetime',
+        '开盘': 'open',
+        '最高': 'high',
+        '最低': 'low',
+        '收盘': 'close',
+        '成交量': 'volume',
+        '成交额': 'amount',
+    }
+    
     def __init__(self):
+        self._ak = None
         self.available = self._check_available()
     
     def _check_available(self) -> bool:
         try:
             import akshare as ak
+            self._ak = ak  # 绑定模块，取数方法中不再重复import
             return True
         except ImportError:
-            print("AKShare未安装")
+            logger.warning("AKShare未安装")
             return False
     
     def get_stock_list(self) -> pd.DataFrame:
@@ -161,13 +316,12 @@ class AKShareAdapter(DataSourceAdapter):
             return pd.DataFrame()
         
         try:
-            import akshare as ak
-            df = ak.stock_zh_a_spot_em()
+            df = self._ak.stock_zh_a_spot_em()
             df = df[['代码', '名称']]
             df.columns = ['symbol', 'name']
             return df
         except Exception as e:
-            print(f"AKShare获取股票列表失败: {e}")
+            logger.warning(f"AKShare获取股票列表失败: {e}")
             return pd.DataFrame()
     
     def get_daily_bars(self, symbol: str, start: str, end: str) -> pd.DataFrame:
@@ -176,10 +330,9 @@ class AKShareAdapter(DataSourceAdapter):
             return pd.DataFrame()
         
         try:
-            import akshare as ak
             # AKShare格式: 000001，需要去掉后缀
             code = symbol.split('.')[0]
-            df = ak.stock_zh_a_hist(
+            df = self._ak.stock_zh_a_hist(
                 symbol=code,
                 period="daily",
                 start_date=start,
@@ -188,72 +341,269 @@ class AKShareAdapter(DataSourceAdapter):
             )
             
             if df is not None and len(df) > 0:
-                df.rename(columns={
-                    '日期': 'datetime',
-                    '开盘': 'open',
-                    '最高': 'high',
-                    '最低': 'low',
-                    '收盘': 'close',
-                    '成交量': 'volume',
-                    '成交额': 'amount',
-                }, inplace=True)
-                return df
+                # 按列投影直接构造结果，日期一次解析为datetime64
+                columns = {new: df[old] for old, new in self.DAILY_COLUMNS.items()}
+                columns['datetime'] = pd.to_datetime(columns['datetime'])
+                return pd.DataFrame(columns, copy=False)
             return pd.DataFrame()
         except Exception as e:
-            print(f"AKShare获取数据失败: {e}")
+            logger.warning(f"AKShare获取数据失败: {e}")
             return pd.DataFrame()
+    
+    def get_daily_bars_many(self, symbols: List[str], start: str, end: str,
+                            max_workers: int = 16) -> Dict[str, pd.DataFrame]:
+        """批量获取日K数据：各请求为独立HTTP调用，使用线程池并发以重叠网络往返延迟"""
+        if not self.available:
+            return {}
+        
+        frames = _fetch_concurrently(
+            lambda symbol: self.get_daily_bars(symbol, start, end), symbols, max_workers
+        )
+        return {symbol: df for symbol, df in frames.items() if not df.empty}
 
 
 class DataLoader:
-    """数据加载器 - 按优先级选择数据源"""
+    """
+    数据加载器 - 按优先级选择数据源
+    日K数据两级缓存：进程内LRU（按 (代码, 起止日期)） + 本地Parquet（每只股票一个文件）
+    仅缓存截止日期早于今天的历史区间，避免当日未收盘数据被固化；
+    两级缓存均按获取时间计算有效期 bar_ttl，过期后重新获取以跟上复权价格的变化
+    股票列表按TTL缓存在内存及本地Parquet中，进程重启后仍然有效
+    """
     
-    def __init__(self, qmt_path: Optional[str] = None):
-        self.adapters = {
-            'vnpy': VnpyAdapter(),
-            'miniqmt': MiniQMTAdapter(qmt_path),
-            'akshare': AKShareAdapter(),
+    def __init__(self, qmt_path: Optional[str] = None, mem_cache_size: int = 256,
+                 cache_dir: str = CACHE_DIR, stock_list_ttl: float = STOCK_LIST_TTL,
+                 bar_ttl: float = DAILY_BAR_TTL):
+        # 适配器按需构造：首次用到时才导入对应SDK，前序数据源取到数据后不再构造后续适配器
+        self._factories = {
+            'vnpy': VnpyAdapter,
+            'miniqmt': lambda: MiniQMTAdapter(qmt_path),
+            'akshare': AKShareAdapter,
         }
+        self.adapters: Dict[str, DataSourceAdapter] = {}
+        self._adapter_lock = threading.Lock()
         self.priority = ['vnpy', 'miniqmt', 'akshare']
+        self.cache_dir = cache_dir
+        self.mem_cache_size = mem_cache_size
+        self._mem_cache: "OrderedDict[tuple, Tuple[float, pd.DataFrame]]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self.bar_ttl = bar_ttl
+        self.stock_list_ttl = stock_list_ttl
+        self._stocklist_cache: Optional[Tuple[float, pd.DataFrame]] = None
+    
+    def _get_adapter(self, source: str) -> DataSourceAdapter:
+        """获取数据源适配器，首次调用时构造"""
+        adapter = self.adapters.get(source)
+        if adapter is None:
+            with self._adapter_lock:
+                adapter = self.adapters.get(source)
+                if adapter is None:
+                    adapter = self.adapters[source] = self._factories[source]()
+        return adapter
     
     def get_stock_list(self) -> pd.DataFrame:
-        """获取股票列表"""
+        """获取股票列表（缓存有效期内直接返回缓存，调用方不应原地修改）"""
+        now = time.time()
+        cached = self._stocklist_cache
+        if cached is not None and now - cached[0] < self.stock_list_ttl:
+            return cached[1]
+        
+        path = os.path.join(self.cache_dir, "stocklist.parquet")
+        if pq is not None and os.path.exists(path):
+            fetched_at = os.path.getmtime(path)
+            if now - fetched_at < self.stock_list_ttl:
+                try:
+                    df = pd.read_parquet(path)
+                    self._stocklist_cache = (fetched_at, df)
+                    return df
+                except Exception as e:
+                    logger.warning(f"读取股票列表缓存失败 {path}: {e}")
+        
+        df = self._fetch_stock_list()
+        if not df.empty:
+            self._stocklist_cache = (now, df)
+            if pq is not None:
+                try:
+                    write_parquet(path, df)
+                except Exception as e:
+                    logger.debug(f"写入股票列表缓存失败 {path}: {e}")
+        return df
+    
+    def _fetch_stock_list(self) -> pd.DataFrame:
+        """按优先级从数据源获取股票列表"""
         for source in self.priority:
-            adapter = self.adapters[source]
+            adapter = self._get_adapter(source)
             if adapter.available:
                 df = adapter.get_stock_list()
                 if not df.empty:
-                    print(f"使用 {source} 获取股票列表")
+                    logger.debug(f"使用 {source} 获取股票列表")
                     return df
         
-        print("警告：所有数据源均不可用")
+        logger.warning("所有数据源均不可用")
         return pd.DataFrame()
     
     def get_daily_bars(self, symbol: str, start: str, end: str) -> pd.DataFrame:
-        """获取日K数据"""
+        """
+        获取日K数据
+        命中缓存时返回的是缓存中的同一个DataFrame，调用方不应原地修改
+        """
+        if end >= datetime.now().strftime("%Y%m%d"):
+            return self._fetch_daily_bars(symbol, start, end)
+        
+        key = (symbol, start, end)
+        df = self._mem_get(key)
+        if df is not None:
+            return df
+        
+        df, fetched_at = self._load_daily_bars(symbol, start, end)
+        if not df.empty:
+            self._mem_put(key, df, fetched_at)
+        return df
+    
+    def _mem_get(self, key: tuple) -> Optional[pd.DataFrame]:
+        with self._cache_lock:
+            entry = self._mem_cache.get(key)
+            if entry is None:
+                return None
+            if time.time() - entry[0] >= self.bar_ttl:
+                del self._mem_cache[key]
+                return None
+            self._mem_cache.move_to_end(key)
+            return entry[1]
+    
+    def _mem_put(self, key: tuple, df: pd.DataFrame, fetched_at: float):
+        with self._cache_lock:
+            self._mem_cache[key] = (fetched_at, df)
+            if len(self._mem_cache) > self.mem_cache_size:
+                self._mem_cache.popitem(last=False)
+    
+    def download_many(self, symbols: List[str], start: str, end: str,
+                      workers: int = 16) -> Dict[str, pd.DataFrame]:
+        """
+        并发获取多只股票日K（经由 get_daily_bars，命中缓存的股票不发起请求）
+        适用于数据源没有批量接口的情况；单只股票失败时记录日志并返回空DataFrame，不影响其余股票
+        """
+        return _fetch_concurrently(
+            lambda symbol: self.get_daily_bars(symbol, start, end), symbols, workers
+        )
+    
+    def _load_daily_bars(self, symbol: str, start: str, end: str) -> Tuple[pd.DataFrame, float]:
+        """
+        从本地Parquet读取日K，未覆盖请求区间或已过期时回源，返回 (数据, 获取时间)
+        回源区间取缓存区间与请求区间的并集，使文件始终对应一段连续日期
+        """
+        df, start_all, end_all, fetched_at = self._read_cached_bars(symbol, start, end)
+        if df is not None:
+            return df, fetched_at
+        
+        fetched_at = time.time()
+        df = self._fetch_daily_bars(symbol, start_all, end_all)
+        if df.empty:
+            return df, fetched_at
+        return self._store_daily_bars(symbol, df, start, end, start_all, end_all, fetched_at), fetched_at
+    
+    def _read_cached_bars(self, symbol: str, start: str,
+                          end: str) -> Tuple[Optional[pd.DataFrame], str, str, float]:
+        """
+        读取本地Parquet：未过期且覆盖请求区间时返回截取后的数据及获取时间；
+        否则返回 None 及需回源的区间（缓存区间与请求区间的并集）
+        """
+        path = os.path.join(self.cache_dir, f"{symbol}.parquet")
+        cached, cached_start, cached_end, fetched_at = _read_bar_file(path)
+        if cached is None:
+            return None, start, end, 0.0
+        fresh = time.time() - fetched_at < self.bar_ttl
+        if fresh and cached_start <= start and end <= cached_end:
+            return _slice_dates(cached, start, end), start, end, fetched_at
+        return None, min(start, cached_start), max(end, cached_end), 0.0
+    
+    def _store_daily_bars(self, symbol: str, df: pd.DataFrame, start: str, end: str,
+                          start_all: str, end_all: str, fetched_at: float) -> pd.DataFrame:
+        """
+        回源数据写入本地Parquet，返回请求区间内的部分
+        请求区间内没有数据时不写入，避免把该区间记为已覆盖（日期解析有误时会一直命中空结果）
+        """
+        sliced = _slice_dates(df, start, end)
+        if not sliced.empty:
+            path = os.path.join(self.cache_dir, f"{symbol}.parquet")
+            _write_bar_file(path, df, start_all, end_all, fetched_at)
+        return sliced
+    
+    def _fetch_daily_bars(self, symbol: str, start: str, end: str) -> pd.DataFrame:
+        """按优先级从数据源获取日K数据"""
         for source in self.priority:
-            adapter = self.adapters[source]
+            adapter = self._get_adapter(source)
             if adapter.available:
                 df = adapter.get_daily_bars(symbol, start, end)
                 if not df.empty:
-                    print(f"使用 {source} 获取 {symbol} 日K数据")
+                    logger.debug(f"使用 {source} 获取 {symbol} 日K数据")
                     return df
         
-        print(f"警告：无法获取 {symbol} 数据")
+        logger.warning(f"无法获取 {symbol} 数据")
         return pd.DataFrame()
     
     def download_daily_bars(self, symbol: str, start: str, end: str) -> bool:
         """下载日K数据并保存到数据库"""
-        df = self.get_daily_bars(symbol, start, end)
-        if df.empty:
-            return False
+        return symbol in self.download_daily_bars_batch([symbol], start, end)
+    
+    def download_daily_bars_batch(self, symbols: List[str], start: str, end: str) -> Dict[str, pd.DataFrame]:
+        """
+        批量下载日K数据
+        历史区间先查内存与本地Parquet缓存，仅未命中的股票按回源区间分组批量获取，
+        取到的数据写回两级缓存；截止日期不早于今天时不走缓存
+        """
+        if end >= datetime.now().strftime("%Y%m%d"):
+            result = self._fetch_daily_bars_many(symbols, start, end)
+        else:
+            result = {}
+            misses: Dict[Tuple[str, str], List[str]] = {}
+            for symbol in symbols:
+                df = self._mem_get((symbol, start, end))
+                if df is None:
+                    df, start_all, end_all, fetched_at = self._read_cached_bars(symbol, start, end)
+                    if df is None:
+                        misses.setdefault((start_all, end_all), []).append(symbol)
+                        continue
+                    self._mem_put((symbol, start, end), df, fetched_at)
+                result[symbol] = df
+            
+            for (start_all, end_all), group in misses.items():
+                fetched_at = time.time()
+                for symbol, df in self._fetch_daily_bars_many(group, start_all, end_all).items():
+                    df = self._store_daily_bars(symbol, df, start, end, start_all, end_all, fetched_at)
+                    if not df.empty:
+                        self._mem_put((symbol, start, end), df, fetched_at)
+                        result[symbol] = df
         
         # TODO: 保存到InfluxDB
-        print(f"已获取 {symbol} {len(df)} 条日K数据")
-        return True
+        for symbol, df in result.items():
+            logger.debug(f"已获取 {symbol} {len(df)} 条日K数据")
+        return result
+    
+    def _fetch_daily_bars_many(self, symbols: List[str], start: str, end: str) -> Dict[str, pd.DataFrame]:
+        """按优先级依次交给各数据源批量获取，前一数据源未取到的股票由下一数据源补齐"""
+        result: Dict[str, pd.DataFrame] = {}
+        pending = list(symbols)
+        for source in self.priority:
+            if not pending:
+                break
+            adapter = self._get_adapter(source)
+            if adapter.available:
+                fetched = adapter.get_daily_bars_many(pending, start, end)
+                if fetched:
+                    logger.debug(f"使用 {source} 获取 {len(fetched)} 只股票日K数据")
+                    result.update(fetched)
+                    pending = [symbol for symbol in pending if symbol not in fetched]
+        
+        if pending:
+            logger.warning(f"{len(pending)} 只股票无法获取数据")
+        return result
 
 
 # 测试代码
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    
     loader = DataLoader()
     
     # 测试获取股票列表
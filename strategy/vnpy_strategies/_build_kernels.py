@@ -0,0 +1,33 @@
+"""
+AOT编译策略数值内核
+生成原生扩展 strategy_kernels_aot，运行时直接调用，免去 Numba JIT 首次编译的预热开销
+（多股票并行的网格内核依赖 parallel 编译，仍使用JIT版本）
+
+用法（在 strategy 目录下执行）：
+    python -m vnpy_strategies._build_kernels
+"""
+import os
+
+from numba.pycc import CC
+
+# 构建时必须基于JIT内核，不能加载已有的原生扩展
+os.environ["STRATEGY_KERNELS_JIT_ONLY"] = "1"
+
+from ._kernels import _dualma_signals, macd_tail  # noqa: E402
+
+cc = CC('strategy_kernels_aot')
+cc.output_dir = os.path.dirname(os.path.abspath(__file__))
+
+# (导出名, 内核, 签名)
+KERNELS = [
+    ('dualma_signals', _dualma_signals, 'void(f8[:], f8[:], i8, i8, f8, i1[:])'),
+    ('macd_tail', macd_tail, 'UniTuple(f8, 3)(f8[:], i8, i8, i8)'),
+]
+
+for name, kernel, signature in KERNELS:
+    cc.export(name, signature)(kernel.py_func)
+
+
+if __name__ == "__main__":
+    cc.compile()
+    print(f"已生成 strategy_kernels_aot 于 {cc.output_dir}")
@@ -0,0 +1,137 @@
+"""
+策略数值内核 (Numba)
+参数扫描回测时，将逐根K线的均线/交叉判断整段预先算出，
+策略循环只负责按信号下单，避免 Python 解释器开销
+"""
+import os
+
+import numpy as np
+
+try:
+    from numba import njit, prange
+except ImportError:  # 未安装numba时退化为纯Python实现（结果一致，速度较慢）
+    def njit(*args, **kwargs):
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return lambda func: func
+    prange = range
+
+
+# 交易信号
+SIGNAL_BUY = 1      # 金叉
+SIGNAL_SELL = -1    # 死叉
+SIGNAL_NONE = 0
+
+
+@njit(cache=True)
+def _dualma_signals(close, volume, fast, slow, min_volume, out):
+    """
+    双均线交叉信号，逐根K线语义与 DualMAStrategy.trading_logic 一致：
+    均线窗口计入每根K线；成交量低于阈值的K线不判断交叉，也不更新上一次差值；
+    上一次差值初始为0，窗口填满后的首根K线即可产生信号
+    """
+    n = close.shape[0]
+    ready = max(fast, slow) - 1
+    fast_sum = 0.0
+    slow_sum = 0.0
+    last_diff = 0.0
+    for i in range(n):
+        # 与 BaseStrategy.update_sma 相同的先减后加顺序，累加和逐位一致
+        if i >= fast:
+            fast_sum -= close[i - fast]
+        if i >= slow:
+            slow_sum -= close[i - slow]
+        fast_sum += close[i]
+        slow_sum += close[i]
+
+        out[i] = SIGNAL_NONE
+        if i < ready or volume[i] < min_volume:
+            continue
+        diff = fast_sum / fast - slow_sum / slow
+        if diff > 0 and last_diff <= 0:
+            out[i] = SIGNAL_BUY
+        elif diff < 0 and last_diff >= 0:
+            out[i] = SIGNAL_SELL
+        last_diff = diff
+
+
+@njit(cache=True, parallel=True)
+def _dualma_signals_grid(close, volume, fast, slow, min_volume, out):
+    """多只股票并行计算双均线信号，close/volume/out 每行一只股票"""
+    for j in prange(close.shape[0]):
+        _dualma_signals(close[j], volume[j], fast, slow, min_volume, out[j])
+
+
+@njit(cache=True)
+def macd_tail(close, fast, slow, signal):
+    """
+    MACD 末值 (dif, dea, hist)：单次遍历同时递推快慢EMA与信号线，不生成中间数组
+    起步方式与 TA-Lib MACD（ArrayManager.macd）一致：慢线取前 slow 根均值，
+    快线取截至同一根K线的 fast 根均值，信号线取前 signal 个DIF的均值；数据不足时返回NaN
+    """
+    if slow < fast:
+        fast, slow = slow, fast
+    n = close.shape[0]
+    if n < slow + signal - 1:
+        return np.nan, np.nan, np.nan
+    a_fast = 2.0 / (fast + 1)
+    a_slow = 2.0 / (slow + 1)
+    a_signal = 2.0 / (signal + 1)
+
+    ema_fast = 0.0
+    ema_slow = 0.0
+    for i in range(slow):
+        ema_slow += close[i]
+        if i >= slow - fast:
+            ema_fast += close[i]
+    ema_fast /= fast
+    ema_slow /= slow
+    dif = ema_fast - ema_slow
+    signal_sum = dif
+    dea = dif
+
+    for i in range(slow, n):
+        ema_fast += a_fast * (close[i] - ema_fast)
+        ema_slow += a_slow * (close[i] - ema_slow)
+        dif = ema_fast - ema_slow
+        k = i - slow + 1  # 当前DIF序号
+        if k < signal:
+            signal_sum += dif
+            dea = signal_sum / (k + 1)
+        else:
+            dea += a_signal * (dif - dea)
+    return dif, dea, dif - dea
+
+
+def dualma_signals(close: np.ndarray, fast: int, slow: int,
+                   volume: np.ndarray = None, min_volume: float = 0.0) -> np.ndarray:
+    """
+    计算双均线交叉信号
+    返回与 close 等长的 int8 数组：1 金叉，-1 死叉，0 无信号；
+    传入二维 close（每行一只股票）时按行并行计算
+    """
+    close = np.ascontiguousarray(close, dtype=np.float64)
+    if volume is None:
+        volume = np.full(close.shape, np.inf)
+    volume = np.ascontiguousarray(volume, dtype=np.float64)
+    out = np.empty(close.shape, dtype=np.int8)
+    if close.ndim == 2:
+        _dualma_signals_grid(close, volume, int(fast), int(slow), float(min_volume), out)
+    else:
+        _dualma_signals_1d(close, volume, int(fast), int(slow), float(min_volume), out)
+    return out
+
+
+# 一维信号入口；并行网格内核仍调用JIT版本 _dualma_signals
+_dualma_signals_1d = _dualma_signals
+
+# 优先使用AOT编译的原生内核（python -m vnpy_strategies._build_kernels 生成），
+# 免去首次调用时的JIT编译；未构建或设置 STRATEGY_KERNELS_JIT_ONLY 时沿用JIT版本
+if not os.environ.get("STRATEGY_KERNELS_JIT_ONLY"):
+    try:
+        from . import strategy_kernels_aot as _native
+    except ImportError:
+        _native = None
+    if _native is not None:
+        _dualma_signals_1d = _native.dualma_signals
+        macd_tail = _native.macd_tail
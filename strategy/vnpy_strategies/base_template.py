@@ -3,6 +3,10 @@ vn.py 基础策略模板
 所有策略应继承此模板
 """
 
+import math
+
+import numpy as np
+
 from vnpy.app.cta_strategy import CtaTemplate, StopOrder
 from vnpy.trader.object import TickData, BarData, TradeData, OrderData
 from vnpy.trader.constant import Direction, Offset
@@ -25,16 +29,41 @@ class BaseStrategy(CtaTemplate):
     # 内部变量
     current_price = 0.0
     entry_price = 0.0
-    highest_price = 0.0         # 持仓期间最高价（移动止损用）
-    lowest_price = float('inf') # 持仓期间最低价
+    highest_price = -math.inf   # 持仓期间最高价（移动止损用）
+    lowest_price = math.inf     # 持仓期间最低价
     
     parameters = ["risk_percent", "max_position", "stop_loss_pct", "take_profit_pct"]
     variables = ["current_price", "entry_price", "highest_price", "lowest_price"]
     
+    # 增量均线：(窗口参数名, 均线变量名)，子类声明后由 on_bar 自动维护
+    sma_fields = ()
+    
+    # 仅声明本类新增的实例属性；参数/变量与 CtaTemplate 同为类属性默认值，不能放入 __slots__
+    __slots__ = ('_sma_windows', '_sma_sums', '_close_ring', '_ring_count', 'sma_ready',
+                 '_signals', '_signal_index', '_signal_closes', '_signal_highs', '_exit_index')
+    
     def __init__(self, cta_engine, strategy_name, vt_symbol, setting):
         """构造函数"""
         super().__init__(cta_engine, strategy_name, vt_symbol, setting)
         
+        # 持仓极值按实例初始化，不与其他策略实例共用类属性
+        self.highest_price = -math.inf
+        self.lowest_price = math.inf
+        
+        # 收盘价环形缓冲区（长度为最大窗口）及各窗口累加和，参数在父类构造中已载入
+        self._sma_windows = [int(getattr(self, name)) for name, _ in self.sma_fields]
+        self._sma_sums = [0.0] * len(self._sma_windows)
+        self._close_ring = np.empty(max(self._sma_windows, default=1))
+        self._ring_count = 0
+        self.sma_ready = False
+        
+        # 预先算出的交易信号（见 set_signals），为None时按 trading_logic 逐根计算
+        self._signals = None
+        self._signal_index = 0
+        self._signal_closes = None
+        self._signal_highs = None
+        self._exit_index = -1
+        
     def on_init(self):
         """策略初始化回调"""
         self.write_log("策略初始化")
@@ -54,19 +83,23 @@ class BaseStrategy(CtaTemplate):
         
         # 更新最高最低价
         if self.pos > 0:
-            self.highest_price = max(self.highest_price, tick.high_price)
+            high = tick.high_price
+            self.highest_price = self.highest_price if self.highest_price > high else high
         elif self.pos < 0:
-            self.lowest_price = min(self.lowest_price, tick.low_price)
+            low = tick.low_price
+            self.lowest_price = self.lowest_price if self.lowest_price < low else low
     
     def on_bar(self, bar: BarData):
         """K线数据回调 - 子类必须实现"""
-        self.current_price = bar.close_price
+        self.update_price(bar)
         
-        # 更新最高最低价
-        if self.pos > 0:
-            self.highest_price = max(self.highest_price, bar.high_price)
-        elif self.pos < 0:
-            self.lowest_price = min(self.lowest_price, bar.low_price)
+        if self._signals is not None:
+            self.replay_bar(bar)
+            return
+            
+        # 增量更新均线
+        if self._sma_windows:
+            self.sma_ready = self.update_sma(bar.close_price)
             
         # 调用风控检查
         self.risk_management(bar)
@@ -74,6 +107,71 @@ class BaseStrategy(CtaTemplate):
         # 调用交易逻辑（子类实现）
         self.trading_logic(bar)
     
+    def update_price(self, bar: BarData):
+        """更新最新价及持仓期间最高最低价"""
+        self.current_price = bar.close_price
+        
+        if self.pos > 0:
+            high = bar.high_price
+            self.highest_price = self.highest_price if self.highest_price > high else high
+        elif self.pos < 0:
+            low = bar.low_price
+            self.lowest_price = self.lowest_price if self.lowest_price < low else low
+    
+    def set_signals(self, signals: np.ndarray, closes: np.ndarray = None, highs: np.ndarray = None):
+        """
+        载入整段预先算出的交易信号（参数扫描等离线回测用）
+        signals 须与引擎随后推送给 on_bar 的K线序列逐根对应（如 BacktestingEngine.history_data），
+        之后 on_bar 按K线序号取信号、跳过指标计算；撮合、持仓与风控仍由引擎逐根驱动
+        同时给出整段 closes/highs 时，开仓成交后由 vectorized_exit 一次找出首个风控触发点，
+        此前的K线跳过逐根风控检查
+        """
+        self._signals = np.asarray(signals).tolist()
+        self._signal_index = 0
+        # 每次载入都覆盖，不沿用上一段K线的数组
+        self._signal_closes = None if closes is None else np.asarray(closes, dtype=np.float64)
+        self._signal_highs = None if highs is None else np.asarray(highs, dtype=np.float64)
+        # 已有持仓的开仓价未经 vectorized_exit 计算，逐根检查
+        self._exit_index = 0 if self.pos else -1
+    
+    def replay_bar(self, bar: BarData):
+        """按预先算出的信号处理一根K线"""
+        i = self._signal_index
+        self._signal_index = i + 1
+        
+        if self._signal_closes is None or 0 <= self._exit_index <= i:
+            self.risk_management(bar)
+        
+        signal = self._signals[i] if i < len(self._signals) else 0
+        if signal:
+            self.on_signal(bar, signal)
+    
+    def on_signal(self, bar: BarData, signal: int):
+        """按交易信号下单 - 使用 set_signals 的子类必须重写"""
+        raise NotImplementedError("子类必须实现on_signal方法")
+    
+    def update_sma(self, close: float) -> bool:
+        """
+        收盘价写入环形缓冲区，各窗口累加和加入新值、减去移出窗口的旧值，O(1)更新
+        数据不足最大窗口时返回False
+        """
+        ring = self._close_ring
+        size = len(ring)
+        t = self._ring_count
+        sums = self._sma_sums
+        for j, window in enumerate(self._sma_windows):
+            if t >= window:
+                sums[j] -= ring[(t - window) % size]
+            sums[j] += close
+        ring[t % size] = close
+        self._ring_count = t + 1
+        
+        if self._ring_count < size:
+            return False
+        for (_, name), window, total in zip(self.sma_fields, self._sma_windows, sums):
+            setattr(self, name, float(total) / window)
+        return True
+    
     def trading_logic(self, bar: BarData):
         """交易逻辑 - 子类必须重写"""
         raise NotImplementedError("子类必须实现trading_logic方法")
@@ -105,6 +203,28 @@ class BaseStrategy(CtaTemplate):
                 self.cover(bar.close_price, abs(self.pos))
                 return
     
+    def vectorized_exit(self, closes: np.ndarray, entry_price: float, direction: int,
+                        highs: np.ndarray = None) -> int:
+        """
+        批量回测用的风控：整段数组一次算出止损/移动止盈的触发掩码，返回首次触发的K线下标
+        判断规则与 risk_management 一致（多头含回撤止盈，空头仅止损），未触发返回-1
+        closes/highs 为开仓后的K线序列；highs 缺省时以收盘价跟踪最高价
+        """
+        closes = np.asarray(closes, dtype=np.float64)
+        if direction > 0:
+            loss_pct = (entry_price - closes) / entry_price * 100
+            highs = closes if highs is None else np.asarray(highs, dtype=np.float64)
+            highest = np.maximum.accumulate(np.maximum(highs, entry_price))
+            drawdown_pct = (highest - closes) / highest * 100
+            triggered = (loss_pct >= self.stop_loss_pct) | (drawdown_pct >= self.take_profit_pct)
+        elif direction < 0:
+            triggered = (closes - entry_price) / entry_price * 100 >= self.stop_loss_pct
+        else:
+            return -1
+        
+        idx = int(np.argmax(triggered)) if triggered.size else -1
+        return idx if idx >= 0 and triggered[idx] else -1
+    
     def on_trade(self, trade: TradeData):
         """成交回调"""
         if trade.offset == Offset.OPEN:
@@ -117,6 +237,23 @@ class BaseStrategy(CtaTemplate):
                   (self.entry_price - trade.price) * trade.volume
             self.write_log(f"平仓成交: {trade.direction.value} {trade.volume}@{trade.price}, 盈亏: {pnl:.2f}")
             self.entry_price = 0.0
+        
+        if self._signal_closes is not None:
+            self._exit_index = self._find_exit(trade)
+    
+    def _find_exit(self, trade: TradeData) -> int:
+        """
+        成交后风控开始逐根检查的K线序号
+        开仓时按剩余K线由 vectorized_exit 求出首个触发点（未触发为-1），其余情况仍有持仓时从当前K线起逐根检查
+        """
+        i = self._signal_index
+        if trade.offset != Offset.OPEN:
+            return i if self.pos else -1
+        
+        direction = 1 if self.pos > 0 else -1 if self.pos < 0 else 0
+        highs = None if self._signal_highs is None else self._signal_highs[i:]
+        k = self.vectorized_exit(self._signal_closes[i:], trade.price, direction, highs)
+        return i + k if k >= 0 else -1
             
     def on_order(self, order: OrderData):
         """委托回调"""
@@ -1,217 +1,92 @@
 """
 双均线策略 - vn.py CTA策略模板
 """
-from vnpy.app.cta_strategy import (
-    CtaTemplate,
-    StopOrder,
-    TickData,
-    BarData,
-    TradeData,
-    OrderData,
-    BarGenerator,
-    ArrayManager,
-)
-
-
-class DualMAStrategy(CtaTemplate):
-    """
-    双均线策略
-    快线（短期）上穿慢线（长期）时买入
-    快线下穿慢线时卖出
-    """
-    author = "StrategyDev"
-    
-    # 策略参数
-    fast_window = 10      # 快线周期
-    slow_window = 30      # 慢线周期
-    fixed_size = 100      # 固定交易数量
-    
-    # 策略变量
-    fast_ma = 0.0         # 快线数值
-    slow_ma = 0.0         # 慢线数值
-    ma_diff = 0.0         # 均线差值
-    
-    parameters = ["fast_window", "slow_window", "fixed_size"]
-    variables = ["fast_ma", "slow_ma", "ma_diff"]
-    
-    def __init__(self, cta_engine, strategy_name, vt_symbol, setting):
-        """构造函数"""
-        super().__init__(cta_engine, strategy_name, vt_symbol, setting)
-        
-        self.bg = BarGenerator(self.on_bar)
-        self.am = ArrayManager()
-    
-    def on_init(self):
-        """策略初始化"""
-        self.write_log("策略初始化")
-        self.load_bar(10)   # 加载10天历史数据
-    
-    def on_start(self):
-        """策略启动"""
-        self.write_log("策略启动")
-        self.put_event()
-    
-    def on_stop(self):
-        """策略停止"""
-        self.write_log("策略停止")
-        self.put_event()
-    
-    def on_tick(self, tick: TickData):
-        """Tick数据回调"""
-        self.bg.update_tick(tick)
-    
-    def on_bar(self, bar: BarData):
-        """K线数据回调"""
-        # 更新K线到ArrayManager
-        self.am.update_bar(bar)
-        
-        # 确保有足够的数据计算均线
-        if not self.am.inited:
-            return
-        
-        # 计算均线
-        self.fast_ma = self.am.sma(self.fast_window, array=False)
-        self.slow_ma = self.am.sma(self.slow_window, array=False)
-        self.ma_diff = self.fast_ma - self.slow_ma
-        
-        # 交易逻辑
-        if self.ma_diff > 0 and self.pos == 0:
-            # 金叉，买入开仓
-            self.buy(bar.close_price, self.fixed_size)
-            self.write_log(f"金叉买入 {bar.close_price}")
-        
-        elif self.ma_diff < 0 and self.pos > 0:
-            # 死叉，卖出平仓
-            self.sell(bar.close_price, abs(self.pos))
-            self.write_log(f"死叉卖出 {bar.close_price}")
-        
-        # 更新界面
-        self.put_event()
-    
-    def on_order(self, order: OrderData):
-        """委托回调"""
-        pass
-    
-    def on_trade(self, trade: TradeData):
-        """成交回调"""
-        self.write_log(f"成交: {trade.direction.value} {trade.volume}@{trade.price}")
-        self.put_event()
-    
-    def on_stop_order(self, stop_order: StopOrder):
-        """停止单回调"""
-        pass
-
-
-class MACDStrategy(CtaTemplate):
-    """
-    MACD趋势策略
-    DIF上穿DEA（金叉）时买入
-    DIF下穿DEA（死叉）时卖出
-    """
-    author = "StrategyDev"
-    
-    # 策略参数
-    fast_period = 12
-    slow_period = 26
-    signal_period = 9
-    fixed_size = 100
-    
-    # 策略变量
-    macd_dif = 0.0
-    macd_dea = 0.0
-    macd_hist = 0.0
-    
-    parameters = ["fast_period", "slow_period", "signal_period", "fixed_size"]
-    variables = ["macd_dif", "macd_dea", "macd_hist"]
-    
-    def __init__(self, cta_engine, strategy_name, vt_symbol, setting):
-        super().__init__(cta_engine, strategy_name, vt_symbol, setting)
-        self.bg = BarGenerator(self.on_bar)
-        self.am = ArrayManager()
-    
-    def on_bar(self, bar: BarData):
-        self.am.update_bar(bar)
-        
-        if not self.am.inited:
-            return
-        
-        # 计算MACD
-        dif, dea, hist = self.am.macd(
-            self.fast_period,
-            self.slow_period,
-            self.signal_period,
-            array=False
-        )
-        
-        self.macd_dif = dif
-        self.macd_dea = dea
-        self.macd_hist = hist
-        
-        # 交易逻辑
-        if hist > 0 and self.pos == 0:
-            self.buy(bar.close_price, self.fixed_size)
-        elif hist < 0 and self.pos > 0:
-            self.sell(bar.close_price, abs(self.pos))
-        
-        self.put_event()
-
-
-class RSIStrategy(CtaTemplate):
-    """
-    RSI均值回复策略
-    RSI < 30（超卖）时买入
-    RSI > 70（超买）时卖出
-    """
-    author = "StrategyDev"
-    
-    # 策略参数
-    rsi_period = 14
-    rsi_oversold = 30
-    rsi_overbought = 70
-    fixed_size = 100
-    
-    # 策略变量
-    rsi_value = 0.0
-    
-    parameters = ["rsi_period", "rsi_oversold", "rsi_overbought", "fixed_size"]
-    variables = ["rsi_value"]
-    
-    def __init__(self, cta_engine, strategy_name, vt_symbol, setting):
-        super().__init__(cta_engine, strategy_name, vt_symbol, setting)
-        self.bg = BarGenerator(self.on_bar)
-        self.am = ArrayManager()
-    
-    def on_bar(self, bar: BarData):
-        self.am.update_bar(bar)
-        
-        if not self.am.inited:
-            return
-        
-        # 计算RSI
-        self.rsi_value = self.am.rsi(self.rsi_period, array=False)
-        
-        # 交易逻辑
-        if self.rsi_value < self.rsi_oversold and self.pos == 0:
-            # 超卖，买入
-            self.buy(bar.close_price, self.fixed_size)
-            self.write_log(f"RSI超卖({self.rsi_value:.2f})买入")
-        
-        elif self.rsi_value > self.rsi_overbought and self.pos > 0:
-            # 超买，卖出
-            self.sell(bar.close_price, abs(self.pos))
-            self.write_log(f"RSI超买({self.rsi_value:.2f})卖出")
-        
-        self.put_event()
+from typing import Dict
 
+from vnpy.app.cta_strategy import ArrayManager
+
+from ._kernels import SIGNAL_BUY, SIGNAL_NONE, SIGNAL_SELL, macd_tail
+from .indicator_template import DEFAULT_AM_SIZE, StrategySpec, make_strategy_class
+
+
+def _sign_signal(value: float) -> int:
+    if value > 0:
+        return SIGNAL_BUY
+    if value < 0:
+        return SIGNAL_SELL
+    return SIGNAL_NONE
+
+
+def _dualma_indicator(am: ArrayManager, fast_window: int, slow_window: int) -> tuple:
+    fast_ma = am.sma(fast_window, array=False)
+    slow_ma = am.sma(slow_window, array=False)
+    return fast_ma, slow_ma, fast_ma - slow_ma
+
+
+def _macd_indicator(am: ArrayManager, fast_period: int, slow_period: int, signal_period: int) -> tuple:
+    # 单次遍历收盘价数组，只取末值
+    return macd_tail(am.close_array, fast_period, slow_period, signal_period)
+
+
+def _rsi_indicator(am: ArrayManager, rsi_period: int) -> tuple:
+    return (am.rsi(rsi_period, array=False),)
+
+
+def _rsi_signal(strategy) -> int:
+    if strategy.rsi_value < strategy.rsi_oversold:
+        return SIGNAL_BUY
+    if strategy.rsi_value > strategy.rsi_overbought:
+        return SIGNAL_SELL
+    return SIGNAL_NONE
+
+
+# 策略描述表
+STRATEGY_SPECS: Dict[str, StrategySpec] = {
+    "DualMA": StrategySpec(
+        doc="双均线策略：快线（短期）上穿慢线（长期）时买入，快线下穿慢线时卖出",
+        params={"fast_window": 10, "slow_window": 30, "fixed_size": 100},
+        indicator_params=("fast_window", "slow_window"),
+        outputs=("fast_ma", "slow_ma", "ma_diff"),
+        indicator=_dualma_indicator,
+        signal=lambda s: _sign_signal(s.ma_diff),
+        # 预热长度不小于原 ArrayManager 默认长度，保持开始交易的K线位置不变
+        am_size=lambda s: max(DEFAULT_AM_SIZE, max(s.fast_window, s.slow_window) + 10),
+        buy_log="金叉买入 {price}",
+        sell_log="死叉卖出 {price}",
+    ),
+    "MACD": StrategySpec(
+        doc="MACD趋势策略：DIF上穿DEA（金叉）时买入，DIF下穿DEA（死叉）时卖出",
+        params={"fast_period": 12, "slow_period": 26, "signal_period": 9, "fixed_size": 100},
+        indicator_params=("fast_period", "slow_period", "signal_period"),
+        outputs=("macd_dif", "macd_dea", "macd_hist"),
+        indicator=_macd_indicator,
+        signal=lambda s: _sign_signal(s.macd_hist),
+        am_size=lambda s: max(DEFAULT_AM_SIZE, s.slow_period + s.signal_period + 10),
+    ),
+    "RSI": StrategySpec(
+        doc="RSI均值回复策略：RSI < 30（超卖）时买入，RSI > 70（超买）时卖出",
+        params={"rsi_period": 14, "rsi_oversold": 30, "rsi_overbought": 70, "fixed_size": 100},
+        indicator_params=("rsi_period",),
+        outputs=("rsi_value",),
+        indicator=_rsi_indicator,
+        signal=_rsi_signal,
+        am_size=lambda s: max(DEFAULT_AM_SIZE, s.rsi_period + 10),
+        buy_log="RSI超卖({rsi_value:.2f})买入",
+        sell_log="RSI超买({rsi_value:.2f})卖出",
+    ),
+}
 
 # 策略注册表
 STRATEGY_REGISTRY = {
-    "DualMA": DualMAStrategy,
-    "MACD": MACDStrategy,
-    "RSI": RSIStrategy,
+    name: make_strategy_class(f"{name}Strategy", spec, __name__)
+    for name, spec in STRATEGY_SPECS.items()
 }
 
+DualMAStrategy = STRATEGY_REGISTRY["DualMA"]
+MACDStrategy = STRATEGY_REGISTRY["MACD"]
+RSIStrategy = STRATEGY_REGISTRY["RSI"]
+
 
 def get_strategy(name: str):
     """获取策略类"""
-    return STRATEGY_REGISTRY.get(name)
\ No newline at end of file
+    return STRATEGY_REGISTRY.get(name)
@@ -0,0 +1,211 @@
+"""
+指标策略模板 - 由 StrategySpec 描述生成 vn.py CTA策略类
+通用基类单独成模块：vn.py 会把策略模块中所有 CtaTemplate 子类列为可选策略
+"""
+import threading
+import weakref
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from vnpy.app.cta_strategy import (
+    CtaTemplate,
+    StopOrder,
+    TickData,
+    BarData,
+    TradeData,
+    OrderData,
+    BarGenerator,
+    ArrayManager,
+)
+
+from ._kernels import SIGNAL_BUY, SIGNAL_SELL
+
+
+# ArrayManager 默认长度；EMA/Wilder 类指标的结果依赖历史长度，不小于该值以保持结果不变
+DEFAULT_AM_SIZE = 100
+
+
+class ArrayManagerPool:
+    """
+    ArrayManager 复用池
+    按 (合约, 长度) 分组；策略停止时归还，每组至多保留一个空闲实例，
+    持有策略已被回收却未归还的实例在下次取用时清理。
+    参数网格回测中依次创建的策略实例共用同一组数组，避免反复分配
+    """
+    
+    def __init__(self):
+        self._in_use: Dict[tuple, List[tuple]] = {}
+        self._free: Dict[tuple, tuple] = {}
+        self._lock = threading.Lock()
+    
+    def acquire(self, owner, vt_symbol: str, size: int) -> ArrayManager:
+        """为 owner 取得一个长度为 size 的 ArrayManager；owner 已持有时原样返回"""
+        key = (vt_symbol, size)
+        with self._lock:
+            entries = self._in_use.get(key, [])
+            for am, ref in entries:
+                if ref() is owner:
+                    return am
+            
+            alive = []
+            for entry in entries:
+                if entry[1]() is None:
+                    self._free.setdefault(key, entry)
+                else:
+                    alive.append(entry)
+            
+            am, ref = self._free.pop(key, (None, None))
+            if am is None:
+                am = ArrayManager(size)
+            elif ref() is not owner:  # 同一策略停止后重新启动时保留已有K线
+                reset_array_manager(am)
+            alive.append((am, weakref.ref(owner)))
+            self._in_use[key] = alive
+            return am
+    
+    def release(self, owner):
+        """归还 owner 持有的 ArrayManager"""
+        with self._lock:
+            for key, entries in self._in_use.items():
+                for i, entry in enumerate(entries):
+                    if entry[1]() is owner:
+                        del entries[i]
+                        self._free.setdefault(key, entry)
+                        return
+
+
+def reset_array_manager(am: ArrayManager):
+    """清空K线计数：旧数据会在重新 inited 之前被新K线全部移出"""
+    am.count = 0
+    am.inited = False
+
+
+_AM_POOL = ArrayManagerPool()
+
+
+@dataclass(frozen=True)
+class StrategySpec:
+    """
+    指标策略描述
+    indicator(am, *指标参数) 返回与 outputs 对应的指标末值；
+    signal(strategy) 按策略变量给出 SIGNAL_BUY / SIGNAL_SELL / SIGNAL_NONE
+    """
+    doc: str
+    params: Dict[str, Any]                  # 参数名 -> 默认值（生成 parameters 与类属性）
+    indicator_params: Tuple[str, ...]       # 依次传给 indicator 的参数
+    outputs: Tuple[str, ...]                # 指标变量名（生成 variables 与类属性）
+    indicator: Callable[..., tuple]
+    signal: Callable[[Any], int]
+    am_size: Callable[[Any], int]           # ArrayManager 长度
+    buy_log: Optional[str] = None           # 开平仓日志模板，可引用策略属性与 price
+    sell_log: Optional[str] = None
+
+
+class IndicatorStrategy(CtaTemplate):
+    """
+    通用指标策略：由 StrategySpec 计算指标与信号
+    信号为买入且空仓时开仓，信号为卖出且持仓时平仓
+    """
+    author = "StrategyDev"
+    
+    spec: StrategySpec = None
+    
+    __slots__ = ('bg', 'am')
+    
+    def __init__(self, cta_engine, strategy_name, vt_symbol, setting):
+        """构造函数"""
+        if self.spec is None:
+            raise TypeError(f"{type(self).__name__} 未指定 spec，请使用 make_strategy_class 生成的策略类")
+        super().__init__(cta_engine, strategy_name, vt_symbol, setting)
+        
+        self.bg = BarGenerator(self.on_bar)
+        self.am = _AM_POOL.acquire(self, vt_symbol, self.spec.am_size(self))
+    
+    def reset(self):
+        """回测边界重置K线缓存"""
+        if self.am is not None:
+            reset_array_manager(self.am)
+    
+    def on_init(self):
+        """策略初始化"""
+        self.write_log("策略初始化")
+        self.load_bar(10)   # 加载10天历史数据
+    
+    def on_start(self):
+        """策略启动"""
+        # 停止时已归还K线缓存，重新启动需再次取得
+        self.am = _AM_POOL.acquire(self, self.vt_symbol, self.spec.am_size(self))
+        self.write_log("策略启动")
+        self.put_event()
+    
+    def on_stop(self):
+        """策略停止"""
+        # vn.py 仍会向已停止的策略推送K线，归还后不再写入该缓存
+        _AM_POOL.release(self)
+        self.am = None
+        self.write_log("策略停止")
+        self.put_event()
+    
+    def on_tick(self, tick: TickData):
+        """Tick数据回调"""
+        self.bg.update_tick(tick)
+    
+    def on_bar(self, bar: BarData):
+        """K线数据回调"""
+        if self.am is None:
+            return
+        self.am.update_bar(bar)
+        
+        if not self.am.inited:
+            return
+        
+        spec = self.spec
+        values = spec.indicator(self.am, *[getattr(self, name) for name in spec.indicator_params])
+        for name, value in zip(spec.outputs, values):
+            setattr(self, name, value)
+        
+        signal = spec.signal(self)
+        if signal == SIGNAL_BUY and self.pos == 0:
+            self.buy(bar.close_price, self.fixed_size)
+            self._log_signal(spec.buy_log, bar)
+        elif signal == SIGNAL_SELL and self.pos > 0:
+            self.sell(bar.close_price, abs(self.pos))
+            self._log_signal(spec.sell_log, bar)
+        
+        self.put_event()
+    
+    def _log_signal(self, template: Optional[str], bar: BarData):
+        if template:
+            fields = {name: getattr(self, name) for name in self.spec.outputs}
+            self.write_log(template.format(price=bar.close_price, **fields))
+    
+    def on_order(self, order: OrderData):
+        """委托回调"""
+        pass
+    
+    def on_trade(self, trade: TradeData):
+        """成交回调"""
+        self.write_log(f"成交: {trade.direction.value} {trade.volume}@{trade.price}")
+        self.put_event()
+    
+    def on_stop_order(self, stop_order: StopOrder):
+        """停止单回调"""
+        pass
+
+
+def make_strategy_class(class_name: str, spec: StrategySpec, module: str) -> type:
+    """
+    由策略描述生成 CtaTemplate 子类，module 为策略类所在模块名（用于pickle按名查找）
+    vn.py 按类加载策略并读取类属性上的 parameters/variables 及默认值
+    """
+    namespace = {
+        "__doc__": spec.doc,
+        "__module__": module,
+        "__slots__": (),
+        "spec": spec,
+        "parameters": list(spec.params),
+        "variables": list(spec.outputs),
+    }
+    namespace.update(spec.params)
+    namespace.update(dict.fromkeys(spec.outputs, 0.0))
+    return type(class_name, (IndicatorStrategy,), namespace)
@@ -3,10 +3,13 @@
 当短期均线上穿长期均线时买入，下穿时卖出
 """
 
+import numpy as np
+
 from vnpy.app.cta_strategy import CtaTemplate, StopOrder
 from vnpy.trader.object import TickData, BarData, TradeData, OrderData
 
-from .base_template import BaseStrategy
+from .._kernels import SIGNAL_BUY, SIGNAL_SELL, dualma_signals
+from ..base_template import BaseStrategy
 
 
 class DualMAStrategy(BaseStrategy):
@@ -40,6 +43,10 @@ class DualMAStrategy(BaseStrategy):
     parameters = ["fast_window", "slow_window", "volume_threshold", "risk_percent", "stop_loss_pct"]
     variables = ["fast_ma", "slow_ma", "ma_diff", "last_ma_diff"]
     
+    sma_fields = (("fast_window", "fast_ma"), ("slow_window", "slow_ma"))
+    
+    __slots__ = ()
+    
     def __init__(self, cta_engine, strategy_name, vt_symbol, setting):
         """构造函数"""
         super().__init__(cta_engine, strategy_name, vt_symbol, setting)
@@ -60,27 +67,26 @@ class DualMAStrategy(BaseStrategy):
         if bar.volume < self.volume_threshold:
             return
         
-        # 检查是否有足够的数据计算均线
-        if not self.am.inited:
+        # 检查是否有足够的数据计算均线（均线已在 on_bar 中增量更新）
+        if not self.sma_ready:
             return
         
-        # 计算均线
-        self.fast_ma = self.am.sma(self.fast_window, array=True)[-1]
-        self.slow_ma = self.am.sma(self.slow_window, array=True)[-1]
-        
         # 计算差值
         self.last_ma_diff = self.ma_diff
         self.ma_diff = self.fast_ma - self.slow_ma
         
         # 判断交叉
-        cross_over = self.ma_diff > 0 and self.last_ma_diff <= 0  # 金叉
-        cross_below = self.ma_diff < 0 and self.last_ma_diff >= 0  # 死叉
-        
-        # 交易信号
-        if cross_over:
+        if self.ma_diff > 0 and self.last_ma_diff <= 0:    # 金叉
+            self.on_signal(bar, SIGNAL_BUY)
+        elif self.ma_diff < 0 and self.last_ma_diff >= 0:  # 死叉
+            self.on_signal(bar, SIGNAL_SELL)
+    
+    def on_signal(self, bar: BarData, signal: int):
+        """按交叉信号下单"""
+        if signal == SIGNAL_BUY:
             # 金叉买入
             if self.pos == 0:
-                self.write_log(f"金叉信号 - 快线:{self.fast_ma:.2f}, 慢线:{self.slow_ma:.2f}")
+                self.write_log(f"金叉信号 - {self._signal_detail(bar)}")
                 self.buy(bar.close_price, 100)
             elif self.pos < 0:
                 # 平空仓
@@ -88,12 +94,31 @@ class DualMAStrategy(BaseStrategy):
                 # 开多仓
                 self.buy(bar.close_price, 100)
                 
-        elif cross_below:
+        elif signal == SIGNAL_SELL:
             # 死叉卖出
             if self.pos > 0:
-                self.write_log(f"死叉信号 - 快线:{self.fast_ma:.2f}, 慢线:{self.slow_ma:.2f}")
+                self.write_log(f"死叉信号 - {self._signal_detail(bar)}")
                 self.sell(bar.close_price, abs(self.pos))
     
+    def _signal_detail(self, bar: BarData) -> str:
+        """信号日志内容：逐根计算均线时记录均线值，使用预算信号时均线未更新，记录收盘价"""
+        if self.sma_ready:
+            return f"快线:{self.fast_ma:.2f}, 慢线:{self.slow_ma:.2f}"
+        return f"收盘价:{bar.close_price:.2f}"
+    
+    def precompute_signals(self, bars: list):
+        """
+        向量化回测：Numba内核一次算出整段交叉信号并载入策略（见 BaseStrategy.set_signals）
+        bars 为引擎将推送的全部K线，如 engine.strategy.precompute_signals(engine.history_data)，
+        之后照常调用 engine.run_backtesting()；不更新 fast_ma/slow_ma 等界面变量
+        """
+        closes = np.fromiter((bar.close_price for bar in bars), dtype=np.float64, count=len(bars))
+        volumes = np.fromiter((bar.volume for bar in bars), dtype=np.float64, count=len(bars))
+        highs = np.fromiter((bar.high_price for bar in bars), dtype=np.float64, count=len(bars))
+        signals = dualma_signals(closes, self.fast_window, self.slow_window,
+                                 volumes, self.volume_threshold)
+        self.set_signals(signals, closes, highs)
+    
     def on_trade(self, trade: TradeData):
         """成交回调"""
         super().on_trade(trade)
@@ -131,16 +156,20 @@ class TripleMAStrategy(BaseStrategy):
     parameters = ["short_window", "medium_window", "long_window", "risk_percent", "stop_loss_pct"]
     variables = ["short_ma", "medium_ma", "long_ma"]
     
+    sma_fields = (
+        ("short_window", "short_ma"),
+        ("medium_window", "medium_ma"),
+        ("long_window", "long_ma"),
+    )
+    
+    __slots__ = ()
+    
     def trading_logic(self, bar: BarData):
         """交易逻辑"""
-        if not self.am.inited:
+        # 三条均线已在 on_bar 中增量更新
+        if not self.sma_ready:
             return
         
-        # 计算三条均线
-        self.short_ma = self.am.sma(self.short_window, array=True)[-1]
-        self.medium_ma = self.am.sma(self.medium_window, array=True)[-1]
-        self.long_ma = self.am.sma(self.long_window, array=True)[-1]
-        
         # 判断趋势
         bull_trend = self.short_ma > self.medium_ma > self.long_ma  # 多头排列
         bear_trend = self.short_ma < self.medium_ma < self.long_ma  # 空头排列